@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# tables are per day and author plus these columns, file_abbr depends on file
+CUBE_DIMENSIONS = [[], ["two_dirs"], ["file_abbr"], ["file", "file_abbr"]]
+CUBE_KEYS = ["datetime", "author"]
+AGGREGATIONS = ["sum", "count", "unique_count", "avg"]
+
+
+class ChartCube:
+    """
+    Pre-aggregates the commit rows the charts are drawn from, once per report: for every day and author, and for every day, author and two_dirs, file_abbr or file, the distinct commits, the churn and the number of rows. A commit has a single day and author, so its distinct count adds up over days and authors and every chart grouping is answered from the tables instead of the rows.
+    """
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    @classmethod
+    def from_frame(cls, df, dimensions=CUBE_DIMENSIONS):
+        tables = []
+        for dimension in dimensions:
+            table = (
+                df.groupby(CUBE_KEYS + dimension, observed=True)
+                .agg(
+                    commits=("commit_hash", "nunique"),
+                    churn=("churn_count", "sum"),
+                    rows=("commit_hash", "size"),
+                )
+                .reset_index()
+            )
+            table["month"] = table["datetime"].dt.to_period("M")
+            tables.append((dimension, table))
+        return cls(tables)
+
+    def since(self, start):
+        """
+        Returns a cube of the days from start on. The tables are grouped by datetime first, so they are sorted by it and sliced with a binary search.
+        """
+        return ChartCube(
+            [
+                (dimension, table.iloc[_search_datetime(table, start) :])
+                for dimension, table in self.tables
+            ]
+        )
+
+    def isin(self, column, values):
+        """
+        Returns a cube of the rows whose column is one of values. Only the tables with the column are kept, e.g. filtering by file leaves the file table, which can't count commits per author anymore.
+        """
+        return ChartCube(
+            [
+                (dimension, table[table[column].isin(values)])
+                for dimension, table in self.tables
+                if column in table.columns
+            ]
+        )
+
+    def aggregate(self, group_columns, value_column, aggregation):
+        """
+        Returns the same series as df.groupby(group_columns, observed=True)[value_column] with the aggregation on the rows of the cube.
+        """
+        table = self._find_table(group_columns, value_column, aggregation)
+        grouped = table.groupby(group_columns, observed=True)
+        if aggregation == "unique_count" and value_column == "commit_hash":
+            result = grouped["commits"].sum()
+        elif aggregation == "unique_count":
+            result = grouped[value_column].nunique()
+        elif aggregation == "count":
+            result = grouped["rows"].sum()
+        elif aggregation == "avg":
+            result = grouped["churn"].sum() / grouped["rows"].sum()
+        else:
+            result = grouped["churn"].sum()
+        return result.rename(value_column)
+
+    def _find_table(self, group_columns, value_column, aggregation):
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(
+                f"aggregation must be one of {AGGREGATIONS}, not {aggregation}"
+            )
+        if aggregation in ["sum", "avg"] and value_column != "churn_count":
+            raise ValueError(f"can't {aggregation} {value_column}, only churn_count")
+        # commit_hash and churn_count are aggregated into the commits, churn and rows
+        needed_columns = set(group_columns)
+        if value_column not in ["commit_hash", "churn_count"]:
+            needed_columns.add(value_column)
+        for dimension, table in self.tables:
+            if not needed_columns <= set(table.columns):
+                continue
+            # distinct commits only add up over days and authors
+            if (
+                aggregation == "unique_count"
+                and value_column == "commit_hash"
+                and not set(dimension) <= set(group_columns)
+            ):
+                continue
+            return table
+        raise ValueError(
+            f"the cube can't group {value_column} {aggregation} by {group_columns}"
+        )
+
+
+def _search_datetime(table, start):
+    return np.searchsorted(
+        table["datetime"].to_numpy(), np.datetime64(start), side="left"
+    )
+
+
+def aggregate(data, group_columns, value_column, aggregation):
+    """
+    Groups a chart's data, which is either the commit rows or a ChartCube of them.
+    """
+    if isinstance(data, ChartCube):
+        return data.aggregate(group_columns, value_column, aggregation)
+    grouped = data.groupby(group_columns, observed=True)[value_column]
+    if aggregation == "unique_count":
+        return grouped.nunique()
+    if aggregation == "count":
+        return grouped.count()
+    if aggregation == "avg":
+        return grouped.mean()
+    if aggregation == "sum":
+        return grouped.sum()
+    raise ValueError(f"aggregation must be one of {AGGREGATIONS}, not {aggregation}")
+
+
+def filter_rows(data, column, values):
+    if isinstance(data, ChartCube):
+        return data.isin(column, values)
+    return data[data[column].isin(values)]
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+CHART_STYLE = "seaborn"
+# matplotlib 3.6 renamed the seaborn styles, the old names were removed in 3.8
+STYLE_FALLBACKS = {"seaborn": "seaborn-v0_8"}
+
+
+class ChartRenderer:
+    """
+    Creates the figures of the chart classes outside of pyplot's list of open figures and clears each one once its chart is saved, so a process can draw any number of charts at constant memory. The chart style is applied once per process, when the first figure is created.
+    """
+
+    _applied_style = None
+
+    def __init__(self, style=CHART_STYLE):
+        self.style = style
+        self.chart_count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def apply_style(self):
+        if ChartRenderer._applied_style != self.style:
+            plt.style.use(get_available_style(self.style))
+            ChartRenderer._applied_style = self.style
+
+    @contextmanager
+    def figure(self):
+        """
+        Yields a new (figure, axes) drawn with the Agg canvas, whatever the pyplot backend is.
+        """
+        self.apply_style()
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        try:
+            yield fig, fig.subplots()
+        finally:
+            fig.clear()
+            self.chart_count = self.chart_count + 1
+
+
+def get_available_style(style):
+    if style in plt.style.available or style not in STYLE_FALLBACKS:
+        return style
+    return STYLE_FALLBACKS[style]
+
+
+DEFAULT_RENDERER = ChartRenderer()
@@ -0,0 +1,64 @@
+import json
+import os
+
+
+class CommitCheckpoint:
+    """
+    Remembers what was ingested into the git log dataset so later runs only parse the other commits, told apart by reachability or hash rather than by date, since a merged branch can bring in commits older than the newest one ingested. A repo is read without the commits reachable from the ref tips of the last run, so only the tips are kept. A log file can't be asked what is reachable, so its checkpoint keeps the hash of every ingested commit instead. commit_hash and epoch are the newest ingested commit.
+    """
+
+    def __init__(self, commit_hash="", epoch=None, commit_hashes=None, tips=None):
+        self.commit_hash = commit_hash
+        self.epoch = epoch
+        # None for log files, whose commits are skipped by hash
+        self.tips = None if tips is None else list(tips)
+        # the hashes of earlier runs, only the new ones are sent back from parallel workers
+        self.commit_hashes = frozenset(commit_hashes or [])
+        self.new_commit_hashes = set()
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Returns None for checkpoints of the older epoch based format, which don't have the ingested hashes or tips, so the dataset is built again.
+        """
+        if not os.path.exists(filename):
+            return cls()
+        with open(filename, "r") as file:
+            checkpoint = json.load(file)
+        if "tips" in checkpoint:
+            return cls(
+                checkpoint["commit_hash"], checkpoint["epoch"], tips=checkpoint["tips"]
+            )
+        if "commit_hashes" in checkpoint:
+            return cls(
+                checkpoint["commit_hash"],
+                checkpoint["epoch"],
+                commit_hashes=checkpoint["commit_hashes"],
+            )
+        return None
+
+    def save(self, filename):
+        checkpoint = {"commit_hash": self.commit_hash, "epoch": self.epoch}
+        if self.tips is None:
+            checkpoint["commit_hashes"] = sorted(
+                self.commit_hashes | self.new_commit_hashes
+            )
+        else:
+            checkpoint["tips"] = self.tips
+        with open(filename, "w") as file:
+            json.dump(checkpoint, file, indent=3)
+
+    def is_new(self, commit_hash):
+        return commit_hash not in self.commit_hashes
+
+    def record(self, commit_hash, epoch):
+        if self.tips is None:
+            self.new_commit_hashes.add(commit_hash)
+        if self.epoch is None or epoch >= self.epoch:
+            self.epoch = epoch
+            self.commit_hash = commit_hash
+
+    def merge(self, other):
+        self.new_commit_hashes |= other.new_commit_hashes
+        if other.epoch is not None:
+            self.record(other.commit_hash, other.epoch)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import subprocess
+
+
+COMPLEXITY_CHUNK_SIZE = 500
+COMMENT_PREFIXES = (b"#", b"//", b"/*", b"*", b"<!--", b"--")
+SPACES_PER_INDENT = 4
+
+
+class ComplexityEngine:
+    """
+    Scores code files with a line based complexity metric in a process pool. Scores are cached by git blob hash, so content that was scored before, in any run, path or branch, is never scored again.
+    """
+
+    def __init__(self, metric, workers=None, cache_filename=None):
+        if metric not in COMPLEXITY_METRICS:
+            raise ValueError(
+                f"metric must be one of {list(COMPLEXITY_METRICS)}, not {metric}"
+            )
+        self.metric = metric
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.cache_filename = cache_filename
+        self.scored_count = 0
+        self.cached_count = 0
+
+    def score_files(self, source_path, file_blob_hashes):
+        """
+        Returns {relative path: score} for the files of a working tree given their blob hashes.
+        """
+        return self._score(
+            file_blob_hashes,
+            lambda blob_files: [
+                (
+                    self.metric,
+                    [
+                        (blob_hash, os.path.join(source_path, file))
+                        for blob_hash, file in chunk
+                    ],
+                )
+                for chunk in chunk_list(blob_files, COMPLEXITY_CHUNK_SIZE)
+            ],
+            score_file_chunk,
+        )
+
+    def score_git_blobs(self, repo_path, file_blob_hashes):
+        """
+        Returns {path: score} for files of a git tree, reading uncached blobs with git cat-file so no checkout is needed.
+        """
+        return self._score(
+            file_blob_hashes,
+            lambda blob_files: [
+                (self.metric, repo_path, [blob_hash for blob_hash, file in chunk])
+                for chunk in chunk_list(blob_files, COMPLEXITY_CHUNK_SIZE)
+            ],
+            score_blob_chunk,
+        )
+
+    def _score(self, file_blob_hashes, create_chunks, score_chunk):
+        cache = self._load_cache()
+        metric_cache = cache.setdefault(self.metric, {})
+        new_blob_files = {}
+        for file, blob_hash in file_blob_hashes.items():
+            if blob_hash not in metric_cache:
+                new_blob_files.setdefault(blob_hash, file)
+        self.cached_count = len(file_blob_hashes) - len(new_blob_files)
+        self.scored_count = len(new_blob_files)
+        if new_blob_files:
+            chunks = create_chunks(list(new_blob_files.items()))
+            # pool workers, e.g. of batch_analysis, can't start pools of their own
+            if (
+                self.workers > 1
+                and len(chunks) > 1
+                and not multiprocessing.current_process().daemon
+            ):
+                with multiprocessing.Pool(min(self.workers, len(chunks))) as pool:
+                    chunk_scores = pool.map(score_chunk, chunks)
+            else:
+                chunk_scores = map(score_chunk, chunks)
+            for scores in chunk_scores:
+                metric_cache.update(scores)
+            self._save_cache(cache)
+        return {
+            file: metric_cache[blob_hash]
+            for file, blob_hash in file_blob_hashes.items()
+        }
+
+    def _load_cache(self):
+        if self.cache_filename is None or not os.path.exists(self.cache_filename):
+            return {}
+        with open(self.cache_filename, "r") as file:
+            return json.load(file)
+
+    def _save_cache(self, cache):
+        if self.cache_filename is None:
+            return
+        with open(self.cache_filename, "w") as file:
+            json.dump(cache, file)
+
+
+def chunk_list(values, chunk_size):
+    return [
+        values[start : start + chunk_size]
+        for start in range(0, len(values), chunk_size)
+    ]
+
+
+def compute_blob_hash(path, stat=None):
+    """
+    Hashes a file the way git hash-object does, so working tree files share cache entries with the blobs of any git tree.
+    """
+    with open(path, "rb") as file:
+        content = file.read()
+    return hash_blob(content)
+
+
+def hash_blob(content):
+    blob_hash = hashlib.sha1(f"blob {len(content)}\0".encode())
+    blob_hash.update(content)
+    return blob_hash.hexdigest()
+
+
+def score_file_chunk(chunk):
+    metric, blob_files = chunk
+    scores = []
+    for blob_hash, path in blob_files:
+        with open(path, "rb") as file:
+            scores.append((blob_hash, score_content(metric, file.read())))
+    return scores
+
+
+def score_blob_chunk(chunk):
+    metric, repo_path, blob_hashes = chunk
+    return [
+        (blob_hash, score_content(metric, content))
+        for blob_hash, content in read_git_blobs(repo_path, blob_hashes)
+    ]
+
+
+def read_git_blobs(repo_path, blob_hashes):
+    command = ["git", "-C", repo_path, "cat-file", "--batch"]
+    output = subprocess.run(
+        command,
+        input="".join(f"{blob_hash}\n" for blob_hash in blob_hashes).encode(),
+        stdout=subprocess.PIPE,
+        check=True,
+    ).stdout
+    position = 0
+    for blob_hash in blob_hashes:
+        header_end = output.index(b"\n", position)
+        # <object> <type> <size> or <object> missing
+        header_parts = output[position:header_end].split()
+        if len(header_parts) != 3:
+            raise ValueError(f"Can't read git blob {blob_hash}")
+        content_start = header_end + 1
+        content_end = content_start + int(header_parts[2])
+        yield blob_hash, output[content_start:content_end]
+        position = content_end + 1
+
+
+def score_content(metric, content):
+    # binary files score 0 so determine_hotspot_data skips them
+    if b"\0" in content:
+        return 0
+    return COMPLEXITY_METRICS[metric](content)
+
+
+def get_logical_lines(content):
+    for line in content.splitlines():
+        code = line.strip()
+        if code != b"" and not code.startswith(COMMENT_PREFIXES):
+            yield line
+
+
+def count_logical_lines(content):
+    """
+    Counts the lines that are neither blank nor comment only.
+    """
+    return sum(1 for line in get_logical_lines(content))
+
+
+def calculate_whitespace_complexity(content):
+    """
+    Sums the logical indentation of every logical line, a tab or four spaces being one indent, which tracks nesting depth much better than file size does.
+    """
+    total_indents = 0
+    for line in get_logical_lines(content):
+        indentation = line[: len(line) - len(line.lstrip())]
+        total_indents = (
+            total_indents
+            + (indentation.count(b"\t") * SPACES_PER_INDENT + indentation.count(b" "))
+            // SPACES_PER_INDENT
+        )
+    return total_indents
+
+
+COMPLEXITY_METRICS = {
+    "lines": count_logical_lines,
+    "whitespace": calculate_whitespace_complexity,
+}
@@ -3,6 +3,9 @@ import json
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from ChartCube import aggregate
+from ChartRenderer import DEFAULT_RENDERER
+
 
 class DateHistogram:
     def __init__(
@@ -18,7 +21,6 @@ class DateHistogram:
         self._aggregation = "sum"
         self._chart_type = "area"
         self._input_df = df
-        plt.style.use("seaborn")
 
         # plt.show()
 
@@ -43,21 +45,12 @@ class DateHistogram:
         self._date_period_name = "new_date"
 
     def _group_data(self):
-        if self._aggregation == "sum":
-            new_group = self._input_df.groupby([self._date_period_name])[
-                self._value_column
-            ].sum()
-
-        if self._aggregation == "count":
-            new_group = self._input_df.groupby([self._date_period_name])[
-                self._value_column
-            ].count()
-
-        if self._aggregation == "unique_count":
-            new_group = self._input_df.groupby([self._date_period_name])[
-                self._value_column
-            ].nunique()
-        return new_group
+        return aggregate(
+            self._input_df,
+            [self._date_period_name],
+            self._value_column,
+            self._aggregation,
+        ).sort_index()
 
     def to_json(self):
         self._grouped_df = self._group_data()
@@ -65,16 +58,25 @@ class DateHistogram:
         json_dict = json.loads(json_str)
         return json_dict
 
-    def save_plot(self, filename):
-        fig, ax = plt.subplots()
+    def get_plot(self, filename):
         self._grouped_df = self._group_data()
-        if self._chart_type == "bar":
-            self._grouped_df.plot(kind=self._chart_type, stacked=True, width=0.8, ax=ax)
+        return plot_date_histogram, (self._grouped_df, self._chart_type, filename)
+
+    def save_plot(self, filename, renderer=None):
+        plot_func, plot_args = self.get_plot(filename)
+        plot_func(*plot_args, renderer=renderer)
+
+
+def plot_date_histogram(grouped_df, chart_type, filename, renderer=None):
+    renderer = renderer or DEFAULT_RENDERER
+    with renderer.figure() as (fig, ax):
+        if chart_type == "bar":
+            grouped_df.plot(kind=chart_type, stacked=True, width=0.8, ax=ax)
         else:
-            self._grouped_df.plot(kind=self._chart_type, stacked=True, ax=ax)
-        plt.xticks(rotation=90)
-        legend = plt.legend(frameon=1)
+            grouped_df.plot(kind=chart_type, stacked=True, ax=ax)
+        plt.setp(ax.get_xticklabels(), rotation=90)
+        legend = ax.legend(frameon=1)
         frame = legend.get_frame()
         frame.set_facecolor("white")
-        plt.tight_layout()
-        plt.savefig(filename)
+        fig.tight_layout()
+        fig.savefig(filename)
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+
+TREE_COLUMNS = [
+    "path",
+    "name",
+    "depth",
+    "parent",
+    "is_file",
+    "files",
+    "commits",
+    "churn",
+    "authors",
+    "score",
+]
+
+
+class DirectoryTree:
+    """
+    Rolls the commit rows up to every directory of any depth, a prefix tree of the file paths with the root "" at depth 0 and the files as leaves. Each node has its files, distinct commits, churn, distinct authors and the summed hotspot score of the files below it. The nodes are stored in pre-order, so every subtree is a contiguous range of rows and is read without looking at the rest of the tree.
+    """
+
+    def __init__(self, nodes, ends):
+        self.nodes = nodes
+        self._ends = ends
+        self._node_ids = {path: node for node, path in enumerate(nodes["path"])}
+
+    @classmethod
+    def from_frame(cls, df, scores=None):
+        """
+        Builds the tree from the file, commit_hash, author and churn_count columns. The rows are read once: the distinct file and commit or author pairs are expanded to the file's ancestors and counted again per node, since distinct counts don't add up over the children. scores maps files to their hotspot score, files without one score 0.
+        """
+        if scores is None:
+            scores = {}
+        # files of rows left out by a time window are still categories
+        file_column = df["file"].cat.remove_unused_categories()
+        files = file_column.cat.categories
+        file_parts = [tuple(str(file).split("/")) for file in files]
+        node_parts = {()}
+        for parts in file_parts:
+            for depth in range(1, len(parts) + 1):
+                node_parts.add(parts[:depth])
+        # tuples sort every prefix before the paths that extend it, in pre-order
+        node_parts = sorted(node_parts)
+        node_ids = {parts: node for node, parts in enumerate(node_parts)}
+        parents, ends = _get_parents_and_ends(node_parts)
+
+        ancestor_files = []
+        ancestor_nodes = []
+        for file_code, parts in enumerate(file_parts):
+            for depth in range(len(parts) + 1):
+                ancestor_files.append(file_code)
+                ancestor_nodes.append(node_ids[parts[:depth]])
+        ancestors = _Ancestors(
+            np.array(ancestor_files, dtype=np.int64),
+            np.array(ancestor_nodes, dtype=np.int64),
+            len(files),
+            len(node_parts),
+        )
+
+        file_codes = file_column.cat.codes.to_numpy(np.int64)
+        file_churn = np.bincount(
+            file_codes, weights=df["churn_count"].to_numpy(), minlength=len(files)
+        )
+        file_scores = np.array(
+            [scores.get(str(file), 0) for file in files], dtype=np.float64
+        )
+        nodes = pd.DataFrame(
+            {
+                "path": ["/".join(parts) for parts in node_parts],
+                "name": [parts[-1] if parts else "" for parts in node_parts],
+                "depth": [len(parts) for parts in node_parts],
+                "parent": parents,
+                "is_file": np.isin(
+                    np.arange(len(node_parts)),
+                    [node_ids[parts] for parts in file_parts],
+                ),
+                "files": ancestors.sum(np.ones(len(files))).astype(np.int64),
+                "commits": ancestors.count_distinct(file_codes, df["commit_hash"]),
+                "churn": ancestors.sum(file_churn).astype(np.int64),
+                "authors": ancestors.count_distinct(file_codes, df["author"]),
+                "score": ancestors.sum(file_scores).round(1),
+            }
+        )
+        return cls(nodes[TREE_COLUMNS], ends)
+
+    def subtree(self, path="", depth=None):
+        """
+        Returns the nodes of the directory or file at path and below it, at most depth levels further down, in pre-order.
+        """
+        node = self._find(path)
+        subtree = self.nodes.iloc[node : self._ends[node]]
+        if depth is not None:
+            subtree = subtree[subtree["depth"] <= subtree["depth"].iat[0] + depth]
+        return subtree
+
+    def level(self, depth):
+        """
+        Returns the directories at a depth, e.g. 2 for the dir_1/dir_2 directories.
+        """
+        return self.nodes[(self.nodes["depth"] == depth) & ~self.nodes["is_file"]]
+
+    def to_json(self, path="", depth=None):
+        """
+        Nests the subtree at path into dicts of name, path, files, commits, churn, authors and score with the children of directories in children, the hierarchy treemap layouts take.
+        """
+        subtree = self.subtree(path, depth)
+        node_dicts = {}
+        for node, row in zip(
+            subtree.index, subtree.drop(columns="depth").to_dict("records")
+        ):
+            parent = row.pop("parent")
+            if not row.pop("is_file"):
+                row["children"] = []
+            node_dicts[node] = row
+            # the parent of the subtree's root is outside of it
+            if parent in node_dicts:
+                node_dicts[parent]["children"].append(row)
+        return node_dicts[subtree.index[0]]
+
+    def _find(self, path):
+        node = self._node_ids.get(path.strip("/"))
+        if node is None:
+            raise ValueError(f"{path} is not in the directory tree")
+        return node
+
+
+class _Ancestors:
+    """
+    The (file, node) pairs of every file and its ancestors including itself, sorted by file.
+    """
+
+    def __init__(self, files, nodes, file_count, node_count):
+        self.files = files
+        self.nodes = nodes
+        self.node_count = node_count
+        self.counts = np.bincount(files, minlength=file_count)
+        self.starts = np.cumsum(self.counts) - self.counts
+
+    def sum(self, file_values):
+        return np.bincount(
+            self.nodes, weights=file_values[self.files], minlength=self.node_count
+        )
+
+    def count_distinct(self, file_codes, column):
+        value_count = len(column.cat.categories)
+        pairs = _unique(file_codes * value_count + column.cat.codes.to_numpy(np.int64))
+        pair_files = pairs // value_count
+        repeats = self.counts[pair_files]
+        pair_starts = np.cumsum(repeats) - repeats
+        positions = np.repeat(self.starts[pair_files] - pair_starts, repeats)
+        positions += np.arange(repeats.sum())
+        node_pairs = _unique(
+            self.nodes[positions] * value_count
+            + np.repeat(pairs % value_count, repeats)
+        )
+        return np.bincount(node_pairs // value_count, minlength=self.node_count)
+
+
+def _unique(values):
+    # sorting is faster than the hash table np.unique uses for large int arrays
+    values = np.sort(values)
+    is_first = np.ones(len(values), dtype=bool)
+    is_first[1:] = values[1:] != values[:-1]
+    return values[is_first]
+
+
+def _get_parents_and_ends(node_parts):
+    parents = np.full(len(node_parts), -1, dtype=np.int64)
+    ends = np.full(len(node_parts), len(node_parts), dtype=np.int64)
+    open_nodes = []
+    for node, parts in enumerate(node_parts):
+        while (
+            open_nodes
+            and node_parts[open_nodes[-1]] != parts[: len(node_parts[open_nodes[-1]])]
+        ):
+            ends[open_nodes.pop()] = node
+        if open_nodes:
+            parents[node] = open_nodes[-1]
+        open_nodes.append(node)
+    return parents, ends
@@ -0,0 +1,191 @@
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from LookupTable import LookupTable
+
+
+class GitLogDataset:
+    """
+    Columnar version of the git log csv. Epoch, timestamp and churn are stored as integers and commit hashes, authors and files are interned into LookupTables during ingestion so each row only holds integer ids. The dir_1..dir_4 names only depend on the file, so they are kept once per file in a directory LookupTable instead of once per row.
+    """
+
+    ROW_LOOKUP_COLUMNS = ["commit_hash", "author", "file"]
+    DIRECTORY_COLUMNS = ["dir_1", "dir_2", "dir_3", "dir_4"]
+    INTEGER_COLUMNS = ["epoch", "timestamp", "churn_count"]
+
+    def __init__(self):
+        self._tables = {column: LookupTable() for column in self.ROW_LOOKUP_COLUMNS}
+        self._ids = {column: array("i") for column in self.ROW_LOOKUP_COLUMNS}
+        self._integers = {column: array("q") for column in self.INTEGER_COLUMNS}
+        self._directories = LookupTable()
+        # the dir_1..dir_4 ids of file id n are at [n * 4 : n * 4 + 4]
+        self._file_directory_ids = array("i")
+
+    def __len__(self):
+        return len(self._integers["epoch"])
+
+    @classmethod
+    def from_rows(cls, rows):
+        dataset = cls()
+        dataset.add_rows(rows)
+        return dataset
+
+    def add_rows(self, rows):
+        commit_hashes = self._tables["commit_hash"]
+        authors = self._tables["author"]
+        files = self._tables["file"]
+        last_timestamp = None
+        timestamp_seconds = 0
+        for row in rows:
+            self._ids["commit_hash"].append(commit_hashes.intern(row.commit_hash))
+            self._ids["author"].append(authors.intern(row.author))
+            file_count = len(files)
+            self._ids["file"].append(files.intern(row.file))
+            if len(files) > file_count:
+                self._add_file_directories([row.dir_1, row.dir_2, row.dir_3, row.dir_4])
+            # rows of the same commit share a timestamp so only parse it once
+            if row.timestamp != last_timestamp:
+                last_timestamp = row.timestamp
+                timestamp_seconds = int(np.datetime64(row.timestamp, "s").astype(int))
+            self._integers["epoch"].append(int(row.epoch))
+            self._integers["timestamp"].append(timestamp_seconds)
+            self._integers["churn_count"].append(row.churn_count)
+
+    def _add_file_directories(self, directories):
+        for directory in directories:
+            self._file_directory_ids.append(self._directories.intern(directory))
+
+    def extend(self, other):
+        for column in self.ROW_LOOKUP_COLUMNS:
+            table = self._tables[column]
+            value_count = len(table)
+            id_mapping = np.array(
+                [table.intern(value) for value in other._tables[column].values],
+                dtype=np.int32,
+            )
+            other_ids = np.frombuffer(other._ids[column], dtype=np.int32)
+            self._ids[column].frombytes(id_mapping[other_ids].tobytes())
+            if column == "file":
+                new_file_ids = np.nonzero(id_mapping >= value_count)[0]
+                for other_file_id in new_file_ids:
+                    start = other_file_id * 4
+                    self._add_file_directories(
+                        other._directories.values[id]
+                        for id in other._file_directory_ids[start : start + 4]
+                    )
+        for column in self.INTEGER_COLUMNS:
+            self._integers[column].extend(other._integers[column])
+
+    def save(self, filename):
+        arrays = {}
+        for column in self.ROW_LOOKUP_COLUMNS:
+            arrays[f"{column}_ids"] = np.frombuffer(self._ids[column], np.int32)
+            arrays[f"{column}_values"] = encode_values(self._tables[column].values)
+        arrays["file_directory_ids"] = np.frombuffer(self._file_directory_ids, np.int32)
+        arrays["directory_values"] = encode_values(self._directories.values)
+        for column in self.INTEGER_COLUMNS:
+            arrays[column] = np.frombuffer(self._integers[column], dtype=np.int64)
+        with open(filename, "wb") as file:
+            np.savez(file, **arrays)
+
+    @classmethod
+    def load(cls, filename):
+        dataset = cls()
+        with np.load(filename) as arrays:
+            for column in cls.ROW_LOOKUP_COLUMNS:
+                dataset._tables[column] = LookupTable(
+                    decode_values(arrays[f"{column}_values"])
+                )
+                dataset._ids[column].frombytes(arrays[f"{column}_ids"].tobytes())
+            dataset._directories = LookupTable(
+                decode_values(arrays["directory_values"])
+            )
+            dataset._file_directory_ids.frombytes(
+                arrays["file_directory_ids"].tobytes()
+            )
+            for column in cls.INTEGER_COLUMNS:
+                dataset._integers[column].frombytes(arrays[column].tobytes())
+        return dataset
+
+    def _categorical(self, ids, table):
+        # sorted categories so grouping orders match the plain string columns of the csv
+        ranks, categories = table.sorted_ids()
+        codes = np.array(ranks, dtype=np.int32)[ids]
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    def _row_ids(self, column):
+        return np.frombuffer(self._ids[column], dtype=np.int32)
+
+    def _directory_ids(self, level):
+        file_directory_ids = np.frombuffer(self._file_directory_ids, dtype=np.int32)
+        return file_directory_ids[level::4][self._row_ids("file")]
+
+    def _timestamps(self):
+        seconds = np.frombuffer(self._integers["timestamp"], dtype=np.int64)
+        return seconds.astype("datetime64[s]")
+
+    def to_dataframe(self, columns=None):
+        """
+        Builds the same columns as read_git_log_csv, or only the given columns.
+        """
+        timestamps = pd.Series(self._timestamps()).astype("datetime64[ns]")
+        column_builders = {
+            "commit_hash": lambda: self._lookup_categorical("commit_hash"),
+            "epoch": lambda: np.frombuffer(self._integers["epoch"], dtype=np.int64),
+            "timestamp": lambda: timestamps,
+            "date": lambda: timestamps.dt.normalize(),
+            "year": lambda: timestamps.dt.year,
+            "month": lambda: timestamps.dt.month,
+            "day": lambda: timestamps.dt.day,
+            "author": lambda: self._lookup_categorical("author"),
+            "file": lambda: self._lookup_categorical("file"),
+            "churn_count": lambda: np.frombuffer(
+                self._integers["churn_count"], np.int64
+            ),
+        }
+        for level, column in enumerate(self.DIRECTORY_COLUMNS):
+            column_builders[column] = lambda level=level: self._categorical(
+                self._directory_ids(level), self._directories
+            ).remove_unused_categories()
+        if columns is None:
+            columns = list(column_builders)
+        return pd.DataFrame({column: column_builders[column]() for column in columns})
+
+    def _lookup_categorical(self, column):
+        return self._categorical(self._row_ids(column), self._tables[column])
+
+    def to_csv_lines(self):
+        timestamps = self._timestamps()
+        timestamp_strs = np.datetime_as_string(timestamps, unit="s")
+        dates = timestamps.astype("datetime64[D]")
+        years = dates.astype("datetime64[Y]").astype(int) + 1970
+        months = dates.astype("datetime64[M]").astype(int) % 12 + 1
+        days = (dates - dates.astype("datetime64[M]")).astype(int) + 1
+        hashes, authors, files = [
+            [self._tables[column].values[id] for id in self._ids[column]]
+            for column in self.ROW_LOOKUP_COLUMNS
+        ]
+        dir_1s, dir_2s, dir_3s, dir_4s = [
+            [self._directories.values[id] for id in self._directory_ids(level)]
+            for level in range(len(self.DIRECTORY_COLUMNS))
+        ]
+        for index in range(len(self)):
+            yield (
+                f"{hashes[index]},{self._integers['epoch'][index]},"
+                f"{timestamp_strs[index]},{timestamp_strs[index][:10]},"
+                f"{years[index]},{months[index]},{days[index]},"
+                f'"{authors[index]}","{files[index]}",'
+                f"{self._integers['churn_count'][index]},"
+                f"{dir_1s[index]},{dir_2s[index]},{dir_3s[index]},{dir_4s[index]}\n"
+            )
+
+
+def encode_values(values):
+    text = "".join(value + "\0" for value in values)
+    return np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+
+
+def decode_values(encoded_values):
+    return encoded_values.tobytes().decode("utf-8").split("\0")[:-1]
@@ -0,0 +1,31 @@
+class LookupTable:
+    """
+    Interns repeated strings (authors, files, directory names) into small integer ids. The id of a value is its position in values, so a column of ids plus the table is enough to rebuild the original strings.
+    """
+
+    def __init__(self, values=None):
+        self.values = []
+        self._ids = {}
+        for value in values or []:
+            self.intern(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        id = self._ids.get(value)
+        if id is None:
+            id = len(self.values)
+            self._ids[value] = id
+            self.values.append(value)
+        return id
+
+    def sorted_ids(self):
+        """
+        Maps every id to the rank of its value in sorted order, so categoricals built from the table group and sort like plain strings.
+        """
+        order = sorted(range(len(self.values)), key=self.values.__getitem__)
+        ranks = [0] * len(self.values)
+        for rank, id in enumerate(order):
+            ranks[id] = rank
+        return ranks, [self.values[id] for id in order]
@@ -0,0 +1,63 @@
+import re
+from functools import lru_cache
+
+
+DEFAULT_CACHE_SIZE = 64 * 1024
+
+
+class PathClassifier:
+    """
+    Decides which authors and files are kept in the git log dataset and splits kept files into their dir_1..dir_4 names. The exclusion patterns are compiled once and every decision is cached per unique author and path in a bounded LRU, since the same paths recur in thousands of commits.
+    """
+
+    def __init__(
+        self,
+        exclude_file_pattern="",
+        exclude_author_pattern="",
+        cache_size=DEFAULT_CACHE_SIZE,
+    ):
+        self.cache_size = cache_size
+        self._caches = {}
+        self._excluded_files = compile_exclude_pattern(exclude_file_pattern)
+        self._excluded_authors = compile_exclude_pattern(exclude_author_pattern)
+        self.include_author = self.add_cache("authors", self._include_author)
+        self.classify_file = self.add_cache("files", self._classify_file)
+
+    def add_cache(self, name, func):
+        """
+        Wraps a per author or per path function in an LRU cache of the classifier's size that is reported by cache_info, e.g. for parsers that classify the encoded bytes before decoding them.
+        """
+        cached_func = lru_cache(maxsize=self.cache_size)(func)
+        self._caches[name] = cached_func
+        return cached_func
+
+    def _include_author(self, author):
+        return not is_excluded(author, self._excluded_authors)
+
+    def _classify_file(self, file):
+        """
+        Returns None for excluded files, otherwise the (dir_1, dir_2, dir_3, dir_4) tuple of the file.
+        """
+        if is_excluded(file, self._excluded_files):
+            return None
+        file_dirs = file.split("/")[:-1][:4]
+        return tuple(file_dirs + [""] * (4 - len(file_dirs)))
+
+    def cache_info(self):
+        return {name: cache.cache_info() for name, cache in self._caches.items()}
+
+    def format_cache_info(self):
+        return ", ".join(
+            f"{name} cache {info.hits} hits {info.misses} misses {info.currsize}/{info.maxsize} entries"
+            for name, info in self.cache_info().items()
+        )
+
+
+def compile_exclude_pattern(exclude_pattern):
+    if exclude_pattern == "":
+        return None
+    return re.compile(exclude_pattern, re.IGNORECASE)
+
+
+def is_excluded(value, excluded_pattern):
+    return excluded_pattern is not None and excluded_pattern.search(value) is not None
@@ -0,0 +1,227 @@
+import json
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+DEFAULT_EXCLUDE_DIRS = [
+    ".git",
+    "node_modules",
+    "vendor",
+    "bower_components",
+    "__pycache__",
+    ".venv",
+    "venv",
+    ".tox",
+]
+DEFAULT_SCAN_WORKERS = 8
+
+
+class SourceTreeScanner:
+    """
+    Walks a source tree with os.scandir and measures every file like glob("**/*.*") plus os.path.getsize did, i.e. only names with a "." that aren't hidden. Directories in the exclude list or matched by a .gitignore are pruned instead of walked, subtrees are listed concurrently in a thread pool, and measurements are kept in an optional json cache keyed on path, mtime and size so unchanged files are not measured again.
+    """
+
+    def __init__(
+        self,
+        source_path,
+        exclude_dirs=None,
+        use_gitignore=True,
+        cache_filename=None,
+        workers=DEFAULT_SCAN_WORKERS,
+    ):
+        self.source_path = source_path
+        self.exclude_dirs = set(
+            DEFAULT_EXCLUDE_DIRS if exclude_dirs is None else exclude_dirs
+        )
+        self.use_gitignore = use_gitignore
+        self.cache_filename = cache_filename
+        self.workers = workers
+        self.measured_count = 0
+        self.cached_count = 0
+
+    def scan(self, measure=None):
+        """
+        Returns {relative file path: measure(path, stat)} for the tree, by default the file size. Files whose path, mtime and size match the cache reuse the cached value.
+        """
+        if measure is None:
+            measure = get_file_size
+        cache = self._load_cache(measure.__name__)
+        new_cache = {}
+        results = {}
+        for relative_path, path, stat in self.walk():
+            key = [stat.st_mtime_ns, stat.st_size]
+            cached = cache.get(relative_path)
+            if cached is not None and cached[:2] == key:
+                results[relative_path] = cached[2]
+                self.cached_count = self.cached_count + 1
+            else:
+                results[relative_path] = measure(path, stat)
+                self.measured_count = self.measured_count + 1
+            new_cache[relative_path] = key + [results[relative_path]]
+        self._save_cache(new_cache, measure.__name__)
+        return results
+
+    def walk(self):
+        """
+        Yields (relative path, path, stat) of every file, listing up to workers directories at the same time.
+        """
+        root_ignore_rules = []
+        if self.use_gitignore:
+            root_ignore_rules = read_gitignore(
+                os.path.join(self.source_path, ".git", "info", "exclude"), ""
+            )
+        with ThreadPoolExecutor(self.workers) as executor:
+            pending = {
+                executor.submit(self._list_dir, self.source_path, "", root_ignore_rules)
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, sub_dirs = future.result()
+                    yield from files
+                    for sub_dir in sub_dirs:
+                        pending.add(executor.submit(self._list_dir, *sub_dir))
+
+    def _list_dir(self, path, relative_dir, ignore_rules):
+        if self.use_gitignore:
+            ignore_rules = ignore_rules + read_gitignore(
+                os.path.join(path, ".gitignore"), relative_dir
+            )
+        files = []
+        sub_dirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                relative_path = relative_dir + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in self.exclude_dirs and not is_ignored(
+                        relative_path, True, ignore_rules
+                    ):
+                        sub_dirs.append((entry.path, relative_path + "/", ignore_rules))
+                elif "." in entry.name and entry.is_file():
+                    if not is_ignored(relative_path, False, ignore_rules):
+                        files.append((relative_path, entry.path, entry.stat()))
+        return files, sub_dirs
+
+    def _load_cache(self, measure_name):
+        if self.cache_filename is None or not os.path.exists(self.cache_filename):
+            return {}
+        with open(self.cache_filename, "r") as file:
+            cache = json.load(file)
+        if (
+            cache.get("source_path") != os.path.abspath(self.source_path)
+            or cache.get("measure", get_file_size.__name__) != measure_name
+        ):
+            return {}
+        return cache["files"]
+
+    def _save_cache(self, cache, measure_name):
+        if self.cache_filename is None:
+            return
+        with open(self.cache_filename, "w") as file:
+            json.dump(
+                {
+                    "source_path": os.path.abspath(self.source_path),
+                    "measure": measure_name,
+                    "files": cache,
+                },
+                file,
+            )
+
+
+def is_scanned_path(relative_path, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """
+    Applies the scanner's name rules to a path that wasn't found by walking the tree, e.g. one listed by git.
+    """
+    path_parts = relative_path.split("/")
+    for dir_name in path_parts[:-1]:
+        if dir_name.startswith(".") or dir_name in exclude_dirs:
+            return False
+    return not path_parts[-1].startswith(".") and "." in path_parts[-1]
+
+
+def get_file_size(path, stat):
+    return stat.st_size
+
+
+def read_gitignore(filename, relative_dir):
+    """
+    Returns the (regex, negated, dir_only) rules of a .gitignore whose patterns are relative to relative_dir.
+    """
+    if not os.path.isfile(filename):
+        return []
+    rules = []
+    with open(filename, "r", errors="replace") as file:
+        for line in file:
+            pattern = line.rstrip("\n").rstrip()
+            if pattern == "" or pattern.startswith("#"):
+                continue
+            negated = pattern.startswith("!")
+            if negated:
+                pattern = pattern[1:]
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            if pattern == "":
+                continue
+            rules.append(
+                (
+                    re.compile(gitignore_pattern_to_regex(pattern, relative_dir)),
+                    negated,
+                    dir_only,
+                )
+            )
+    return rules
+
+
+def gitignore_pattern_to_regex(pattern, relative_dir):
+    # patterns with a "/" other than a trailing one are relative to the .gitignore's directory, the rest match a name at any depth below it
+    if "/" in pattern:
+        prefix = re.escape(relative_dir)
+        pattern = pattern.lstrip("/")
+    else:
+        prefix = re.escape(relative_dir) + "(?:.*/)?"
+    regex = ""
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            regex = regex + "(?:.*/)?"
+            index = index + 3
+            continue
+        if pattern.startswith("**", index):
+            regex = regex + ".*"
+            index = index + 2
+            continue
+        if char == "*":
+            regex = regex + "[^/]*"
+        elif char == "?":
+            regex = regex + "[^/]"
+        elif char == "[":
+            end = pattern.find("]", index + 1)
+            if end == -1:
+                regex = regex + re.escape(char)
+            else:
+                char_class = pattern[index + 1 : end]
+                if char_class.startswith("!"):
+                    char_class = "^" + char_class[1:]
+                regex = regex + "[" + char_class + "]"
+                index = end
+        elif char == "\\" and index + 1 < len(pattern):
+            index = index + 1
+            regex = regex + re.escape(pattern[index])
+        else:
+            regex = regex + re.escape(char)
+        index = index + 1
+    return prefix + regex + "$"
+
+
+def is_ignored(relative_path, is_dir, ignore_rules):
+    ignored = False
+    for regex, negated, dir_only in ignore_rules:
+        if dir_only and not is_dir:
+            continue
+        if regex.match(relative_path):
+            ignored = not negated
+    return ignored
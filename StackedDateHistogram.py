@@ -3,6 +3,9 @@ import json
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from ChartCube import aggregate, filter_rows
+from ChartRenderer import DEFAULT_RENDERER
+
 
 class StackedDateHistogram:
     def __init__(
@@ -20,7 +23,6 @@ class StackedDateHistogram:
         self._aggregation = "sum"
         self._chart_type = "area"
         self._input_df = df
-        plt.style.use("seaborn")
 
         # plt.show()
 
@@ -49,58 +51,26 @@ class StackedDateHistogram:
         print(self._input_df)
 
     def _group_data(self):
-
-        if self._aggregation == "sum":
-            largest_df = (
-                self._input_df.groupby([self._grouping_column])[self._value_column]
-                .sum()
-                .nlargest(self._max_groupings)
-                .to_frame()
-            )
-            largest_categories = largest_df.index.values.tolist()
-            # print(largest_categories)
-            filtered_to_largest = self._input_df[
-                self._input_df[self._grouping_column].isin(largest_categories)
-            ]
-
-            new_group = filtered_to_largest.groupby(
-                [self._date_period_name, self._grouping_column]
-            )[self._value_column].sum()
-
-        if self._aggregation == "count":
-            largest_df = (
-                self._input_df.groupby([self._grouping_column])[self._value_column]
-                .count()
-                .nlargest(self._max_groupings)
-                .to_frame()
+        largest_categories = (
+            aggregate(
+                self._input_df,
+                [self._grouping_column],
+                self._value_column,
+                self._aggregation,
             )
-            largest_categories = largest_df.index.values.tolist()
-            # print(largest_categories)
-            filtered_to_largest = self._input_df[
-                self._input_df[self._grouping_column].isin(largest_categories)
-            ]
-
-            new_group = filtered_to_largest.groupby(
-                [self._date_period_name, self._grouping_column]
-            )[self._value_column].count()
-
-        if self._aggregation == "unique_count":
-            largest_df = (
-                self._input_df.groupby([self._grouping_column])[self._value_column]
-                .nunique()
-                .nlargest(self._max_groupings)
-                .to_frame()
-            )
-            largest_categories = largest_df.index.values.tolist()
-            # print(largest_categories)
-            filtered_to_largest = self._input_df[
-                self._input_df[self._grouping_column].isin(largest_categories)
-            ]
-
-            new_group = filtered_to_largest.groupby(
-                [self._date_period_name, self._grouping_column]
-            )[self._value_column].nunique()
-        return new_group
+            .sort_index()
+            .nlargest(self._max_groupings)
+            .index.values.tolist()
+        )
+        filtered_to_largest = filter_rows(
+            self._input_df, self._grouping_column, largest_categories
+        )
+        return aggregate(
+            filtered_to_largest,
+            [self._date_period_name, self._grouping_column],
+            self._value_column,
+            self._aggregation,
+        ).sort_index()
 
     def to_json(self):
         self._grouped_df = self._group_data().unstack()
@@ -108,16 +78,29 @@ class StackedDateHistogram:
         json_dict = json.loads(json_str)
         return json_dict
 
-    def save_plot(self, filename):
-        fig, ax = plt.subplots()
+    def get_plot(self, filename):
         self._grouped_df = self._group_data().unstack()
-        if self._chart_type == "bar":
-            self._grouped_df.plot(kind=self._chart_type, stacked=True, width=0.8, ax=ax)
+        return plot_stacked_date_histogram, (
+            self._grouped_df,
+            self._chart_type,
+            filename,
+        )
+
+    def save_plot(self, filename, renderer=None):
+        plot_func, plot_args = self.get_plot(filename)
+        plot_func(*plot_args, renderer=renderer)
+
+
+def plot_stacked_date_histogram(grouped_df, chart_type, filename, renderer=None):
+    renderer = renderer or DEFAULT_RENDERER
+    with renderer.figure() as (fig, ax):
+        if chart_type == "bar":
+            grouped_df.plot(kind=chart_type, stacked=True, width=0.8, ax=ax)
         else:
-            self._grouped_df.plot(kind=self._chart_type, stacked=True, ax=ax)
-        plt.xticks(rotation=90)
-        legend = plt.legend(frameon=1)
+            grouped_df.plot(kind=chart_type, stacked=True, ax=ax)
+        plt.setp(ax.get_xticklabels(), rotation=90)
+        legend = ax.legend(frameon=1)
         frame = legend.get_frame()
         frame.set_facecolor("white")
-        plt.tight_layout()
-        plt.savefig(filename)
+        fig.tight_layout()
+        fig.savefig(filename)
@@ -1,7 +1,9 @@
 import json
 
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from ChartCube import aggregate, filter_rows
+from ChartRenderer import DEFAULT_RENDERER
 
 
 class StackedHistogram:
@@ -19,8 +21,6 @@ class StackedHistogram:
         self._aggregation = "sum"
         self._chart_type = "bar"
         self._input_df = df
-        plt.clf()
-        plt.style.use("seaborn")
 
         # plt.show()
 
@@ -49,26 +49,25 @@ class StackedHistogram:
         if self._max_groupings != 0:
             prepped_df = self._filter_to_largest_groupings()
 
-        if self._aggregation == "sum":
-            new_group = prepped_df.groupby(
-                [
-                    self._primary_grouping_column,
-                    self._secondary_grouping_column,
-                ]
-            )[self._value_column].sum()
-        if self._aggregation == "count":
-            new_group = prepped_df.groupby(
-                [
-                    self._primary_grouping_column,
-                    self._secondary_grouping_column,
-                ]
-            )[self._value_column].count()
+        new_group = aggregate(
+            prepped_df,
+            [self._primary_grouping_column, self._secondary_grouping_column],
+            self._value_column,
+            self._aggregation,
+        ).sort_index()
         return new_group
 
     def _group_data_unique_count(self):
-        new_group = self._input_df.groupby(
-            [self._primary_grouping_column, self._secondary_grouping_column]
-        ).agg({self._value_column: "nunique"})
+        new_group = (
+            aggregate(
+                self._input_df,
+                [self._primary_grouping_column, self._secondary_grouping_column],
+                self._value_column,
+                "unique_count",
+            )
+            .sort_index()
+            .to_frame()
+        )
         largest_df = (
             new_group[self._value_column].nlargest(self._max_groupings).to_frame()
         )
@@ -83,30 +82,20 @@ class StackedHistogram:
         return filtered_to_largest
 
     def _filter_to_largest_groupings(self):
-        if self._aggregation == "sum":
-            largest_df = (
-                self._input_df.groupby([self._secondary_grouping_column])[
-                    self._value_column
-                ]
-                .sum()
-                .nlargest(self._max_groupings)
-                .to_frame()
+        largest_categories = (
+            aggregate(
+                self._input_df,
+                [self._secondary_grouping_column],
+                self._value_column,
+                self._aggregation,
             )
-        else:
-            largest_df = (
-                self._input_df.groupby([self._secondary_grouping_column])[
-                    self._value_column
-                ]
-                .count()
-                .nlargest(self._max_groupings)
-                .to_frame()
-            )
-        largest_categories = largest_df.index.values.tolist()
-        # print(largest_categories)
-        filtered_to_largest = self._input_df[
-            self._input_df[self._secondary_grouping_column].isin(largest_categories)
-        ]
-        return filtered_to_largest
+            .sort_index()
+            .nlargest(self._max_groupings)
+            .index.values.tolist()
+        )
+        return filter_rows(
+            self._input_df, self._secondary_grouping_column, largest_categories
+        )
 
     def to_json(self):
         self._grouped_df = self._group_data().unstack()
@@ -114,11 +103,21 @@ class StackedHistogram:
         json_dict = json.loads(json_str)
         return json_dict
 
-    def save_plot(self, filename):
+    def get_plot(self, filename):
         self._grouped_df = self._group_data().unstack()
-        self._grouped_df.plot(kind=self._chart_type, stacked=True)
-        plt.tight_layout()
-        legend = plt.legend(frameon=1)
+        return plot_stacked_histogram, (self._grouped_df, self._chart_type, filename)
+
+    def save_plot(self, filename, renderer=None):
+        plot_func, plot_args = self.get_plot(filename)
+        plot_func(*plot_args, renderer=renderer)
+
+
+def plot_stacked_histogram(grouped_df, chart_type, filename, renderer=None):
+    renderer = renderer or DEFAULT_RENDERER
+    with renderer.figure() as (fig, ax):
+        grouped_df.plot(kind=chart_type, stacked=True, ax=ax)
+        fig.tight_layout()
+        legend = ax.legend(frameon=1)
         frame = legend.get_frame()
         frame.set_facecolor("white")
-        plt.savefig(filename)
+        fig.savefig(filename)
@@ -3,15 +3,44 @@ import heapq
 
 class TopX():
 	"""
-	Class that maintains the top N values in an array. Tuples can used to maintain the a list of top word frequencies (Ex: (5743, "the") and (473, "is")).
+	Class that maintains the top N values seen so far in a min-heap of size N, so adding n values costs O(n log N). Tuples can used to maintain the a list of top word frequencies (Ex: (5743, "the") and (473, "is")), or a key function picks the value to rank by. Of values with the same key the one added first ranks higher.
 	"""
-	def __init__(self, topn):
+	def __init__(self, topn, key=None):
 		self.__topn = topn
-		self.values = []
+		self.__key = key if key is not None else lambda item: item
+		self.__heap = []
+		self.__count = 0
 
 	def add(self, item):
-		self.values.append(item)
-		self.values = heapq.nlargest(self.__topn, self.values )
+		self.__push(self.__key(item), item)
 
+	def add_all(self, items):
+		for item in items:
+			self.add(item)
 
-	
+	def merge(self, other):
+		"""
+		Adds the top values of another TopX, e.g. one filled from a different partition of the data. Its values rank after this one's values with the same key.
+		"""
+		for key, order, item in sorted(other.__heap, key=lambda entry: entry[:2], reverse=True):
+			self.__push(key, item)
+		return self
+
+	def __push(self, key, item):
+		# the negative count makes the latest of equal keys the smallest entry, so it is evicted first
+		entry = (key, -self.__count, item)
+		self.__count = self.__count + 1
+		if len(self.__heap) < self.__topn:
+			heapq.heappush(self.__heap, entry)
+		elif self.__heap and entry[:2] > self.__heap[0][:2]:
+			heapq.heapreplace(self.__heap, entry)
+
+	def __len__(self):
+		return len(self.__heap)
+
+	@property
+	def values(self):
+		"""
+		The top values, largest first.
+		"""
+		return [item for key, order, item in sorted(self.__heap, key=lambda entry: entry[:2], reverse=True)]
@@ -1,30 +1,189 @@
-import glob
 import json
 import math
 import mimetypes
+import multiprocessing
 import os
+import subprocess
 import sys
 from collections import namedtuple
 from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from ChartCube import ChartCube
+from ChartRenderer import ChartRenderer, DEFAULT_RENDERER
+from ComplexityEngine import ComplexityEngine, compute_blob_hash
 from DateHistogram import DateHistogram
+from DirectoryTree import DirectoryTree
+from GitLogDataset import GitLogDataset
 from Histogram import Histogram
+from SourceTreeScanner import SourceTreeScanner, is_scanned_path
 from StackedHistogram import StackedHistogram
 from StackedDateHistogram import StackedDateHistogram
 from TopX import TopX
 
+COMPLEXITY_SOURCES = ["working_tree", "git"]
+COMPLEXITY_METRICS = ["size", "lines", "whitespace"]
+READ_CHUNK_SIZE = 1024 * 1024
+SECONDS_PER_DAY = 24 * 60 * 60
+SIX_MONTHS = 180
+BUS_FACTOR_DAYS = 365
+BUS_FACTOR_WINDOW_MONTHS = 12
+BUS_FACTOR_LEVELS = ["file", "dir_1", "dir_2", "dir_3", "dir_4"]
+EMPTY_CHART_ERROR = "no numeric data to plot"
+COUPLING_MAX_COMMIT_FILES = 30
+COUPLING_MIN_SHARED_COMMITS = 5
+COUPLING_TOP_PAIRS = 20
+COUPLING_COLUMNS = [
+    "file",
+    "coupled_file",
+    "shared_commits",
+    "file_commits",
+    "coupled_file_commits",
+    "degree",
+]
+
 FileInfo = namedtuple("FileInfo", "file commits complexity age score")
 
 
-def read_git_log_csv(filename):
-    df = pd.read_csv(filename)
-    df["file_abbr"] = df["file"].map(lambda a: abbreviate_filename(a))
+GIT_LOG_CSV_DTYPES = {
+    "commit_hash": "category",
+    "epoch": "int64",
+    "timestamp": "category",
+    "date": "category",
+    "year": "int16",
+    "month": "int8",
+    "day": "int8",
+    "author": "category",
+    "file": "category",
+    "churn_count": "int64",
+    "dir_1": "category",
+    "dir_2": "category",
+    "dir_3": "category",
+    "dir_4": "category",
+}
+GIT_LOG_DATE_FORMATS = {"timestamp": "%Y-%m-%dT%H:%M:%S", "date": "%Y-%m-%d"}
+# the git log columns used by do_analysis, file_abbr is derived from file
+ANALYSIS_COLUMNS = [
+    "commit_hash",
+    "timestamp",
+    "date",
+    "author",
+    "file",
+    "churn_count",
+    "dir_1",
+    "dir_2",
+]
+
+
+def read_git_log(filename, columns=None):
+    if filename.endswith(".npz"):
+        return read_git_log_npz(filename, columns)
+    return read_git_log_csv(filename, columns)
+
+
+def read_git_log_csv(filename, columns=None):
+    """
+    Loads the git log csv with a fixed schema: repeated strings become categoricals and timestamps are parsed once per unique value. columns limits the load to the columns an analysis needs. Empty dir columns are read as "" rather than NaN.
+    """
+    df = pd.read_csv(
+        filename,
+        usecols=get_git_log_columns(columns),
+        dtype=GIT_LOG_CSV_DTYPES,
+        na_filter=False,
+    )
+    for column, date_format in GIT_LOG_DATE_FORMATS.items():
+        if column in df.columns:
+            df[column] = parse_categorical_dates(df[column], date_format)
+    return remove_github_user(df)
+
+
+def read_git_log_npz(filename, columns=None):
+    df = GitLogDataset.load(filename).to_dataframe(get_git_log_columns(columns))
+    return remove_github_user(df)
+
+
+def parse_categorical_dates(column, date_format):
+    dates = pd.to_datetime(column.cat.categories, format=date_format)
+    return pd.Series(dates.take(column.cat.codes), index=column.index)
+
+
+def get_git_log_columns(columns):
+    if columns is None:
+        return list(GIT_LOG_CSV_DTYPES)
+    # file_abbr and the GitHub author filter need file and author
+    return [
+        column
+        for column in GIT_LOG_CSV_DTYPES
+        if column in columns or column in ["author", "file"]
+    ]
+
+
+def remove_github_user(df):
+    df["file_abbr"] = map_categories(df["file"], abbreviate_filename)
     without_github_user = df[df["author"] != "GitHub"]
-    nans_removed = without_github_user.fillna("", inplace=True)
-    return without_github_user
+    return without_github_user.reset_index(drop=True)
+
+
+def sort_by_time(df):
+    """
+    Sorts the commit rows by timestamp, oldest first, so time windows are sliced with a binary search by get_time_window. git log lists the newest commits first, the order of rows with the same timestamp is kept.
+    """
+    if df["timestamp"].is_monotonic_increasing:
+        return df
+    return df.sort_values("timestamp", kind="stable", ignore_index=True)
+
+
+def get_time_window(df, since=None, until=None):
+    """
+    Returns the rows of a frame sorted by sort_by_time with since <= timestamp < until as a slice of the rows, found by a binary search instead of comparing every timestamp. A missing since or until leaves that side of the window open.
+    """
+    timestamps = df["timestamp"].to_numpy()
+    start = 0
+    end = len(timestamps)
+    if since is not None:
+        start = np.searchsorted(timestamps, np.datetime64(since), side="left")
+    if until is not None:
+        end = np.searchsorted(timestamps, np.datetime64(until), side="left")
+    return df.iloc[start : max(start, end)]
+
+
+def map_categories(column, func):
+    """
+    Applies func once per unique value of a categorical column instead of once per row. The result is categorical too, even when func maps several values to the same result.
+    """
+    mapped_values = [func(value) for value in column.cat.categories]
+    mapped_codes, mapped_categories = pd.factorize(
+        np.asarray(mapped_values, dtype=object), sort=True
+    )
+    codes = mapped_codes[column.cat.codes.to_numpy()]
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=mapped_categories),
+        index=column.index,
+    )
+
+
+def join_columns(df, first_column, second_column, separator="/"):
+    if not (
+        isinstance(df[first_column].dtype, pd.CategoricalDtype)
+        and isinstance(df[second_column].dtype, pd.CategoricalDtype)
+    ):
+        return df[first_column].astype(str) + separator + df[second_column].astype(str)
+    first_categories = df[first_column].cat.categories
+    second_categories = df[second_column].cat.categories
+    pair_codes = df[first_column].cat.codes.to_numpy(np.int64) * len(
+        second_categories
+    ) + df[second_column].cat.codes.to_numpy(np.int64)
+    unique_pairs, codes = np.unique(pair_codes, return_inverse=True)
+    joined_values = [
+        f"{first_categories[pair // len(second_categories)]}{separator}"
+        f"{second_categories[pair % len(second_categories)]}"
+        for pair in unique_pairs
+    ]
+    joined = pd.Categorical.from_codes(codes, categories=joined_values)
+    return pd.Series(joined.reorder_categories(sorted(joined_values)), index=df.index)
 
 
 def abbreviate_filename(filename):
@@ -37,97 +196,247 @@ def abbreviate_filename(filename):
     return filename
 
 
-def calculate_file_complexity(source_path):
-    glob_path = source_path + "/**/*.*"
+def calculate_file_complexity(source_path, cache_filename=None, complexity_engine=None):
     print("\n📄 Source files:")
-    print(f"\tReading: {glob_path}")
+    print(f"\tReading: {source_path}")
+    scanner = SourceTreeScanner(source_path, cache_filename=cache_filename)
     results = {}
 
     non_code_file_count = 0
-    for file in glob.glob(glob_path, recursive=True):
+    measure = None if complexity_engine is None else compute_blob_hash
+    for file, file_size in scanner.scan(measure).items():
         if is_code_file(file):
-            file_size = os.path.getsize(file)
-            relative_file = file.replace(source_path + "/", "")
-            results[relative_file] = file_size
+            results[file] = file_size
         else:
             non_code_file_count = non_code_file_count + 1
     print(f"\tSkipped non-code files: {non_code_file_count}")
+    if scanner.cached_count > 0:
+        print(f"\tReused cached sizes: {scanner.cached_count}")
+    if complexity_engine is not None:
+        results = complexity_engine.score_files(source_path, results)
+        print_complexity_engine_counts(complexity_engine)
     return results
 
 
-def calculate_file_commits(df):
+def calculate_git_tree_complexity(repo_path, revision="HEAD", complexity_engine=None):
+    """
+    Reads the file sizes of a revision from git's tree metadata in one ls-tree call, so no checkout is needed, e.g. for bare mirrors or past revisions.
+    """
+    print("\n📄 Source files:")
+    print(f"\tReading git tree: {repo_path} {revision}")
     results = {}
-    file_commits = df.groupby("file")["commit_hash"].count()
-    for file in file_commits.index:
-        commits = file_commits.loc[file]
-        results[file] = commits
+    blob_hashes = {}
+
+    non_code_file_count = 0
+    for file, blob_hash, file_size in read_git_tree_entries(repo_path, revision):
+        if not is_scanned_path(file):
+            continue
+        if is_code_file(file):
+            results[file] = file_size
+            blob_hashes[file] = blob_hash
+        else:
+            non_code_file_count = non_code_file_count + 1
+    print(f"\tSkipped non-code files: {non_code_file_count}")
+    if complexity_engine is not None:
+        results = complexity_engine.score_git_blobs(repo_path, blob_hashes)
+        print_complexity_engine_counts(complexity_engine)
     return results
 
 
+def print_complexity_engine_counts(complexity_engine):
+    print(
+        f"\tScored {complexity_engine.metric} complexity: {complexity_engine.scored_count}, reused cached scores: {complexity_engine.cached_count}"
+    )
+
+
+def read_git_tree_entries(repo_path, revision="HEAD"):
+    command = ["git", "-C", repo_path, "ls-tree", "-r", "-l", "-z", revision]
+    with subprocess.Popen(command, stdout=subprocess.PIPE) as git_tree:
+        remainder = b""
+        while True:
+            chunk = git_tree.stdout.read(READ_CHUNK_SIZE)
+            if chunk == b"":
+                break
+            entries = (remainder + chunk).split(b"\0")
+            remainder = entries.pop()
+            for entry in entries:
+                tree_entry = parse_git_tree_entry(entry)
+                if tree_entry is not None:
+                    yield tree_entry
+    if git_tree.returncode != 0:
+        raise subprocess.CalledProcessError(git_tree.returncode, command)
+
+
+def parse_git_tree_entry(entry):
+    # <mode> <type> <object> <size>\t<path>, only regular files have a size worth using
+    entry_info, path = entry.split(b"\t", 1)
+    mode, object_type, object_name, size = entry_info.split()
+    if object_type != b"blob" or mode == b"120000":
+        return None
+    return path.decode("utf-8", errors="replace"), object_name.decode(), int(size)
+
+
+def get_file_complexities(
+    source_path, complexity_source, revision, output_dir, complexity_metric="size"
+):
+    complexity_engine = None
+    source_tree_cache_filename = os.path.join(output_dir, "source_tree_cache.json")
+    if complexity_metric != "size":
+        complexity_engine = ComplexityEngine(
+            complexity_metric,
+            cache_filename=os.path.join(output_dir, "complexity_cache.json"),
+        )
+        source_tree_cache_filename = os.path.join(
+            output_dir, "source_tree_hash_cache.json"
+        )
+    if complexity_source == "git":
+        return calculate_git_tree_complexity(source_path, revision, complexity_engine)
+    return calculate_file_complexity(
+        source_path, source_tree_cache_filename, complexity_engine
+    )
+
+
+def calculate_file_stats(df, now=None):
+    """
+    Aggregates the commit rows per file in a single groupby: commits, distinct authors, total churn, first and last commit as seconds since 1970 of the commit timestamp, and the age of the last commit in days at now. The frame is indexed by file in the same order as the file categories.
+    """
+    if now is None:
+        now = datetime.now()
+    epochs = df["timestamp"].to_numpy().astype("datetime64[s]").view(np.int64)
+    file_stats = (
+        pd.DataFrame(
+            {
+                "file": df["file"],
+                "epoch": epochs,
+                "author": df["author"],
+                "churn_count": df["churn_count"],
+            }
+        )
+        .groupby("file", observed=True)
+        .agg(
+            commits=("epoch", "size"),
+            authors=("author", "nunique"),
+            churn=("churn_count", "sum"),
+            first_epoch=("epoch", "min"),
+            last_epoch=("epoch", "max"),
+        )
+        .sort_index()
+    )
+    now_epoch = np.datetime64(now, "s").astype(np.int64)
+    file_stats["age"] = (now_epoch - file_stats["last_epoch"]) // SECONDS_PER_DAY
+    return file_stats
+
+
+def calculate_file_commits(df):
+    return calculate_file_stats(df)["commits"].to_dict()
+
+
 def get_commit_age(df, now):
-    results = {}
-    commit_ages = df.groupby("file")["timestamp"].max()
-    for file in commit_ages.index:
-        max_date_str = commit_ages.loc[file]
-        max_date = datetime.strptime(max_date_str, "%Y-%m-%dT%H:%M:%S")
-        age = (now - max_date).days
-        results[file] = age
-    return results
+    return calculate_file_stats(df, now)["age"].to_dict()
 
 
 def determine_hotspot_data(
-    file_commits, file_complexities, commit_ages, score_func=None
+    file_commits, file_complexities, commit_ages=None, score_func=None
 ):
-    SIX_MONTHS = 180
-    if score_func == None:
-        score_func = (
-            lambda cm, cp, a: cm * cp if a < SIX_MONTHS else math.log(cm * cp, a)
+    """
+    file_commits is either the frame of calculate_file_stats, which has the commit ages too, or a {file: commits} dict that comes with a {file: age} dict in commit_ages. Returns the FileInfo list of calculate_hotspot_scores.
+    """
+    if not isinstance(file_commits, pd.DataFrame):
+        file_commits = pd.DataFrame(
+            {
+                "commits": list(file_commits.values()),
+                "age": [commit_ages.get(file, 1) for file in file_commits],
+            },
+            index=list(file_commits),
         )
+    hotspot_scores = calculate_hotspot_scores(
+        file_commits, file_complexities, score_func
+    )
+    return get_hotspot_file_infos(hotspot_scores)
 
-    results = []
-    max_score = 0
-    for file, commits in file_commits.items():
-        commit_age = commit_ages.get(file, 1) + 1
-        file_complexity = file_complexities.get(file, 0)
-        if file_complexity == 0:
-            # print(f"can't find '{file}'")
-            pass
-        else:
-            # print(f"found '{file}': {file_complexity}")
-            if commits > 2:
-                score = score_func(commits, file_complexity, commit_age)
-                if score > max_score:
-                    max_score = score
-                new_file = FileInfo(
-                    file=file,
-                    commits=commits,
-                    complexity=file_complexity,
-                    score=score,
-                    age=commit_age,
+
+def calculate_hotspot_scores(file_stats, file_complexities, score_func=None):
+    """
+    Scores files with complexity and more than 2 commits as whole columns. score_func gets numpy arrays of commits, complexity and age and returns the scores, which are normalized to 0-100 in one step. Returns a frame of file, commits, complexity, age and score in file_stats order.
+    """
+    if score_func is None:
+        score_func = score_hotspots
+    files = np.asarray(file_stats.index, dtype=object)
+    complexities = (
+        pd.Series(file_complexities, dtype=object)
+        .reindex(files, fill_value=0)
+        .to_numpy()
+    )
+    commits = file_stats["commits"].to_numpy()
+    is_hotspot = (complexities != 0) & (commits > 2)
+    hotspot_scores = pd.DataFrame(
+        {
+            "file": files[is_hotspot],
+            "commits": commits[is_hotspot],
+            "complexity": complexities[is_hotspot].tolist(),
+            "age": file_stats["age"].to_numpy()[is_hotspot] + 1,
+        }
+    )
+    scores = apply_score_func(
+        score_func,
+        hotspot_scores["commits"].to_numpy(),
+        hotspot_scores["complexity"].to_numpy(),
+        hotspot_scores["age"].to_numpy(),
+    )
+    max_score = scores.max() if len(scores) > 0 else 0
+    if max_score > 0:
+        scores = np.round((scores / max_score) * 100, 1)
+    else:
+        # no file scores above 0, dividing by the max would make every score NaN
+        scores = np.zeros(len(scores))
+    hotspot_scores["score"] = scores
+    return hotspot_scores
+
+
+def score_hotspots(commits, complexities, ages):
+    """
+    The default score: commits times complexity, decayed to its log with the age as base once a file hasn't changed for six months.
+    """
+    scores = (commits * complexities).astype(np.float64)
+    is_old = ages >= SIX_MONTHS
+    scores[is_old] = np.log(scores[is_old]) / np.log(ages[is_old])
+    return scores
+
+
+def apply_score_func(score_func, commits, complexities, ages):
+    try:
+        scores = np.asarray(score_func(commits, complexities, ages), dtype=np.float64)
+    except (TypeError, ValueError):
+        # a score function written for single values, e.g. with an if on the age
+        scores = np.array(
+            [
+                score_func(file_commits, file_complexity, file_age)
+                for file_commits, file_complexity, file_age in zip(
+                    commits.tolist(), complexities.tolist(), ages.tolist()
                 )
-                results.append(new_file)
-    normalized_results = []
-    for count, file in enumerate(results):
-        new_score = round((file.score / max_score) * 100, 1)
-        normalized_score = FileInfo(
-            file=file.file,
-            commits=file.commits,
-            complexity=file.complexity,
-            score=new_score,
-            age=file.age,
+            ],
+            dtype=np.float64,
         )
-        normalized_results.append(normalized_score)
-    return normalized_results
+    return np.broadcast_to(scores, commits.shape)
+
+
+def get_hotspot_file_infos(hotspot_scores):
+    return [
+        FileInfo(*values)
+        for values in zip(
+            hotspot_scores["file"].tolist(),
+            hotspot_scores["commits"].tolist(),
+            hotspot_scores["complexity"].tolist(),
+            hotspot_scores["age"].tolist(),
+            hotspot_scores["score"].tolist(),
+        )
+    ]
 
 
 def get_top_hotspots(hotspots, topn=10):
-    top_list = TopX(topn)
-    for hotspot in hotspots:
-        file = hotspot.file
-        score = hotspot.score
-        top_list.add((score, hotspot))
-    hotspot_array = [i[1] for i in top_list.values]
-    return hotspot_array
+    top_list = TopX(topn, key=lambda hotspot: hotspot.score)
+    top_list.add_all(hotspots)
+    return top_list.values
 
 
 def format_hotspot_for_print(hotspots):
@@ -142,8 +451,8 @@ def format_hotspot_for_print(hotspots):
     return text
 
 
-def write_csv_result(file_info):
-    with open("output/git_analysis_result.csv", "w") as results_file:
+def write_csv_result(file_info, output_dir="output"):
+    with open(os.path.join(output_dir, "git_analysis_result.csv"), "w") as results_file:
         results_file.write("commits,complexity,file,score\n")
         for file in file_info:
             results_file.write(
@@ -171,97 +480,523 @@ def is_code_file(path):
     return True
 
 
-def create_charts(df, hotspots):
-    df["two_dirs"] = df["dir_1"] + "/" + df["dir_2"]
+def create_charts(
+    df,
+    hotspots,
+    output_dir="output",
+    bus_factor_over_time=None,
+    workers=None,
+    now=None,
+):
+    """
+    Aggregates the commit rows into a ChartCube once and groups the data of every chart from it, then draws the charts from the small grouped frames in a process pool, since drawing takes longer than grouping. The trailing 30 day and bus factor windows end at now.
+    """
+    if now is None:
+        now = datetime.now()
+    df["two_dirs"] = join_columns(df, "dir_1", "dir_2")
     df["datetime"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
-    df["month"] = df["datetime"].dt.to_period("M")
-
-    create_single_histogram("author", "commit_hash", "unique_count", df)
-    create_single_histogram("author", "churn_count", "sum", df)
-    create_single_histogram("two_dirs", "commit_hash", "unique_count", df)
-    create_single_histogram("file_abbr", "commit_hash", "unique_count", df)
-    create_single_stackeddatehistogram("month", "author", df)
-    create_single_stackeddatehistogram("month", "two_dirs", df)
-    create_single_datehistogram("month", "author", "unique_count", df)
-    create_single_datehistogram("month", "commit_hash", "unique_count", df)
-
-    last_month = datetime.now() - timedelta(days=30)
-    last_30_days = df[df["datetime"] >= last_month]
-    try:
-        create_single_stackeddatehistogram(
-            "datetime", "author", last_30_days, "_30_days"
-        )
-        create_single_stackeddatehistogram(
-            "datetime", "two_dirs", last_30_days, "_30_days"
+    cube = ChartCube.from_frame(df)
+
+    charts = [
+        get_single_histogram_plot(
+            "author", "commit_hash", "unique_count", cube, output_dir=output_dir
+        ),
+        get_single_histogram_plot(
+            "author", "churn_count", "sum", cube, output_dir=output_dir
+        ),
+        get_single_histogram_plot(
+            "two_dirs", "commit_hash", "unique_count", cube, output_dir=output_dir
+        ),
+        get_single_histogram_plot(
+            "file_abbr", "commit_hash", "unique_count", cube, output_dir=output_dir
+        ),
+        get_single_stackeddatehistogram_plot(
+            "month", "author", cube, output_dir=output_dir
+        ),
+        get_single_stackeddatehistogram_plot(
+            "month", "two_dirs", cube, output_dir=output_dir
+        ),
+        get_single_datehistogram_plot(
+            "month", "author", "unique_count", cube, output_dir=output_dir
+        ),
+        get_single_datehistogram_plot(
+            "month", "commit_hash", "unique_count", cube, output_dir=output_dir
+        ),
+    ]
+
+    last_month = now - timedelta(days=30)
+    last_30_days = cube.since(last_month)
+    # the last 30 days can be empty, which skips their charts
+    charts.extend(
+        [
+            get_single_stackeddatehistogram_plot(
+                "datetime", "author", last_30_days, "_30_days", output_dir
+            )
+            + (True,),
+            get_single_stackeddatehistogram_plot(
+                "datetime", "two_dirs", last_30_days, "_30_days", output_dir
+            )
+            + (True,),
+        ]
+    )
+    charts.append(get_bus_factor_plot(df, cube, hotspots, output_dir, now))
+    if bus_factor_over_time is not None:
+        bus_factor_over_time_plot = get_bus_factor_over_time_plot(
+            bus_factor_over_time, hotspots, output_dir
         )
+        if bus_factor_over_time_plot is not None:
+            charts.append(bus_factor_over_time_plot)
+    render_charts(charts, workers)
+
+
+def render_charts(charts, workers=None):
+    if workers is None:
+        workers = os.cpu_count()
+    # pool workers, e.g. of batch_analysis, can't start pools of their own
+    if workers > 1 and len(charts) > 1 and not multiprocessing.current_process().daemon:
+        with multiprocessing.Pool(min(workers, len(charts))) as pool:
+            pool.map(render_chart, charts)
+    else:
+        with ChartRenderer() as renderer:
+            for chart in charts:
+                render_chart(chart, renderer)
+
+
+def render_chart(chart, renderer=None):
+    """
+    chart is the (plot function, plot arguments) of a chart class's get_plot, optionally followed by True when its data may be empty.
+    """
+    plot_func, plot_args, *may_be_empty = chart
+    try:
+        plot_func(*plot_args, renderer=renderer)
     except TypeError as e:
-        if str(e) != "no numeric data to plot":
+        if not (may_be_empty and str(e) == EMPTY_CHART_ERROR):
             raise e
-    create_bus_factor_chart(df, hotspots)
 
 
-def create_single_histogram(field, value_field, aggregation, df, filename_suffix=""):
-    histogram = Histogram(field, value_field, df)
+def get_single_histogram_plot(
+    field, value_field, aggregation, data, filename_suffix="", output_dir="output"
+):
+    histogram = Histogram(field, value_field, data)
     histogram.set_chart_type("barh")
     histogram.set_aggregation(aggregation)
     histogram.set_max_groupings(10)
-    histogram.save_plot(
-        f"output/git_histogram_{field}_{value_field}_{aggregation}{filename_suffix}.png"
+    return histogram.get_plot(
+        os.path.join(
+            output_dir,
+            f"git_histogram_{field}_{value_field}_{aggregation}{filename_suffix}.png",
+        )
     )
 
 
-def create_single_datehistogram(
-    date_field, value_field, aggregation, df, filename_suffix=""
+def get_single_datehistogram_plot(
+    date_field, value_field, aggregation, data, filename_suffix="", output_dir="output"
 ):
-    histogram = DateHistogram(date_field, value_field, df)
+    histogram = DateHistogram(date_field, value_field, data)
     histogram.set_chart_type("bar")
     histogram.set_aggregation(aggregation)
-    histogram.save_plot(
-        f"output/git_datehistogram_{value_field}_{aggregation}{filename_suffix}.png"
+    return histogram.get_plot(
+        os.path.join(
+            output_dir,
+            f"git_datehistogram_{value_field}_{aggregation}{filename_suffix}.png",
+        )
     )
 
 
-def create_single_stackeddatehistogram(
-    date_grouping_field, grouping_field, df, filename_suffix=""
+def get_single_stackeddatehistogram_plot(
+    date_grouping_field, grouping_field, data, filename_suffix="", output_dir="output"
 ):
     histogram = StackedDateHistogram(
-        date_grouping_field, grouping_field, "commit_hash", df
+        date_grouping_field, grouping_field, "commit_hash", data
     )
     histogram.set_chart_type("area")
     histogram.set_aggregation("unique_count")
     histogram.set_max_groupings(5)
-    histogram.save_plot(
-        f"output/git_datehistogram_{grouping_field}{filename_suffix}.png"
+    return histogram.get_plot(
+        os.path.join(
+            output_dir, f"git_datehistogram_{grouping_field}{filename_suffix}.png"
+        )
+    )
+
+
+def calculate_bus_factor(df, levels=BUS_FACTOR_LEVELS):
+    """
+    Counts the distinct commits of every author per file and per dir_1..dir_4 directory, e.g. "src/api", with one groupby per level. Returns a frame of level, path, commits, authors, top_author, top_author_commits, top_author_share and single_owner, sorted by level and path.
+    """
+    level_paths = get_level_paths(df["file"].cat.categories, levels)
+    file_codes = df["file"].cat.codes.to_numpy()
+    level_results = []
+    for level in levels:
+        path_codes, paths = level_paths[level]
+        path_commits = pd.DataFrame(
+            {
+                "path": pd.Categorical.from_codes(path_codes[file_codes], paths),
+                "author": df["author"],
+                "commit_hash": df["commit_hash"],
+            }
+        )
+        author_commits = (
+            path_commits.groupby(["path", "author"], observed=True)["commit_hash"]
+            .nunique()
+            .rename("top_author_commits")
+            .reset_index()
+        )
+        top_authors = author_commits.sort_values(
+            ["path", "top_author_commits", "author"],
+            ascending=[True, False, True],
+            kind="stable",
+        ).drop_duplicates("path")
+        level_result = (
+            path_commits.groupby("path", observed=True)
+            .agg(commits=("commit_hash", "nunique"), authors=("author", "nunique"))
+            .join(top_authors.set_index("path"))
+            .rename(columns={"author": "top_author"})
+            .reset_index()
+        )
+        level_result.insert(0, "level", level)
+        level_results.append(level_result)
+    bus_factor = pd.concat(level_results, ignore_index=True)
+    bus_factor["path"] = bus_factor["path"].astype(str)
+    bus_factor["top_author"] = bus_factor["top_author"].astype(str)
+    bus_factor["top_author_share"] = (
+        bus_factor["top_author_commits"] / bus_factor["commits"]
+    ).round(3)
+    bus_factor["single_owner"] = bus_factor["authors"] == 1
+    return bus_factor[
+        [
+            "level",
+            "path",
+            "commits",
+            "authors",
+            "top_author",
+            "top_author_commits",
+            "top_author_share",
+            "single_owner",
+        ]
+    ]
+
+
+def calculate_bus_factor_over_time(
+    df, window_months=BUS_FACTOR_WINDOW_MONTHS, levels=BUS_FACTOR_LEVELS
+):
+    """
+    Bus factor of every file and dir_1..dir_4 directory for each month of the history, over the window_months months ending with that month. The commits per month, path and author are counted once, then the window slides a month at a time: the entering month's counts are added and the leaving month's are subtracted, so a path's author count only changes when an author's count starts at or drops to 0. Returns a frame of month, level, path, commits, authors and single_owner.
+    """
+    timestamps = df["timestamp"].dt
+    month_numbers = (timestamps.year * 12 + timestamps.month - 1).to_numpy(np.int64)
+    if len(month_numbers) == 0:
+        return pd.DataFrame(
+            columns=["month", "level", "path", "commits", "authors", "single_owner"]
+        )
+    first_month = month_numbers.min()
+    month_offsets = month_numbers - first_month
+
+    level_paths = get_level_paths(df["file"].cat.categories, levels)
+    file_codes = df["file"].cat.codes.to_numpy()
+    path_levels = []
+    path_names = []
+    rows = []
+    for level in levels:
+        path_codes, paths = level_paths[level]
+        row_path_codes = path_codes[file_codes]
+        has_path = row_path_codes >= 0
+        rows.append(
+            pd.DataFrame(
+                {
+                    "month": month_offsets[has_path],
+                    "path": row_path_codes[has_path] + len(path_names),
+                    "author": df["author"].cat.codes.to_numpy()[has_path],
+                    "commit": df["commit_hash"].cat.codes.to_numpy()[has_path],
+                }
+            )
+        )
+        path_levels.extend([level] * len(paths))
+        path_names.extend(paths)
+    month_commits = pd.concat(rows, ignore_index=True).drop_duplicates()
+    pair_commits = (
+        month_commits.groupby(["month", "path", "author"])
+        .size()
+        .reset_index(name="commits")
+    )
+    author_count = len(df["author"].cat.categories)
+    pair_ids, pair_keys = pd.factorize(
+        pair_commits["path"].to_numpy(np.int64) * author_count
+        + pair_commits["author"].to_numpy(np.int64)
+    )
+    pair_paths = pair_keys // author_count
+    path_month_commits = (
+        month_commits.groupby(["month", "path"])["commit"].nunique().reset_index()
+    )
+
+    month_count = month_offsets.max() + 1
+    pair_months = np.split(
+        np.column_stack([pair_ids, pair_commits["commits"].to_numpy()]),
+        np.searchsorted(pair_commits["month"].to_numpy(), np.arange(1, month_count)),
     )
+    path_months = np.split(
+        path_month_commits[["path", "commit"]].to_numpy(),
+        np.searchsorted(
+            path_month_commits["month"].to_numpy(), np.arange(1, month_count)
+        ),
+    )
+    pair_window_commits = np.zeros(len(pair_keys), dtype=np.int64)
+    path_window_commits = np.zeros(len(path_names), dtype=np.int64)
+    path_authors = np.zeros(len(path_names), dtype=np.int64)
+    month_results = []
+    for month in range(month_count):
+        entering_pairs, entering_commits = pair_months[month].T
+        is_new = pair_window_commits[entering_pairs] == 0
+        pair_window_commits[entering_pairs] += entering_commits
+        np.add.at(path_authors, pair_paths[entering_pairs[is_new]], 1)
+        entering_paths, entering_path_commits = path_months[month].T
+        path_window_commits[entering_paths] += entering_path_commits
+        if month >= window_months:
+            leaving_pairs, leaving_commits = pair_months[month - window_months].T
+            pair_window_commits[leaving_pairs] -= leaving_commits
+            is_gone = pair_window_commits[leaving_pairs] == 0
+            np.subtract.at(path_authors, pair_paths[leaving_pairs[is_gone]], 1)
+            leaving_paths, leaving_path_commits = path_months[month - window_months].T
+            path_window_commits[leaving_paths] -= leaving_path_commits
+
+        active_paths = np.flatnonzero(path_authors)
+        month_results.append(
+            pd.DataFrame(
+                {
+                    "month": first_month + month,
+                    "path": active_paths,
+                    "commits": path_window_commits[active_paths],
+                    "authors": path_authors[active_paths],
+                }
+            )
+        )
+    bus_factor_over_time = pd.concat(month_results, ignore_index=True)
+    month_numbers = bus_factor_over_time["month"].to_numpy()
+    # monthly period ordinals count the months since 1970-01
+    bus_factor_over_time["month"] = pd.arrays.PeriodArray(
+        month_numbers - 1970 * 12, dtype="period[M]"
+    )
+    path_ids = bus_factor_over_time["path"].to_numpy()
+    bus_factor_over_time["path"] = np.array(path_names, dtype=object)[path_ids]
+    bus_factor_over_time.insert(
+        1, "level", np.array(path_levels, dtype=object)[path_ids]
+    )
+    bus_factor_over_time["single_owner"] = bus_factor_over_time["authors"] == 1
+    return bus_factor_over_time
+
+
+def get_level_paths(files, levels):
+    """
+    Maps each file category to its path on every level, the file itself or its first 1 to 4 directories like the dir_1..dir_4 columns. Returns {level: (codes, paths)} where the code is -1 for files without that directory.
+    """
+    level_paths = {}
+    file_dirs = [file.split("/")[:-1][:4] for file in files]
+    for level in levels:
+        if level == "file":
+            paths = [str(file) for file in files]
+        else:
+            depth = int(level.split("_")[1])
+            paths = [
+                "/".join(dirs[:depth]) if len(dirs) >= depth else None
+                for dirs in file_dirs
+            ]
+        codes, unique_paths = pd.factorize(pd.Series(paths, dtype=object), sort=True)
+        level_paths[level] = (codes, pd.Index(unique_paths, dtype=object))
+    return level_paths
+
+
+def get_recent_commits(df, now=None, days=BUS_FACTOR_DAYS):
+    if now is None:
+        now = datetime.now()
+    return get_time_window(df, since=now - timedelta(days=days))
+
+
+def write_bus_factor_result(bus_factor, output_dir="output"):
+    bus_factor.to_csv(os.path.join(output_dir, "git_bus_factor.csv"), index=False)
+    with open(os.path.join(output_dir, "git_bus_factor.json"), "w") as file:
+        json.dump(
+            {
+                "days": BUS_FACTOR_DAYS,
+                "single_owner_count": int(bus_factor["single_owner"].sum()),
+                "paths": bus_factor.to_dict(orient="records"),
+            },
+            file,
+            indent=3,
+            default=str,
+        )
+
+
+def get_bus_factor_over_time_plot(bus_factor_over_time, hotspots, output_dir="output"):
+    """
+    Plots the authors per month of the top hotspot files, like the shipped bus_factor_over_time.png. Returns None when no top hotspot has commits.
+    """
+    hotspot_files = [f.file for f in get_top_hotspots(hotspots, 5)]
+    hotspot_bus_factor = bus_factor_over_time[
+        (bus_factor_over_time["level"] == "file")
+        & (bus_factor_over_time["path"].isin(hotspot_files))
+    ]
+    if len(hotspot_bus_factor) == 0:
+        return None
+    hotspot_authors = hotspot_bus_factor.pivot(
+        index="month", columns="path", values="authors"
+    ).reindex(
+        pd.period_range(
+            bus_factor_over_time["month"].min(),
+            bus_factor_over_time["month"].max(),
+            freq="M",
+        ),
+        fill_value=0,
+    )
+    return plot_bus_factor_over_time, (
+        hotspot_authors.fillna(0),
+        os.path.join(output_dir, "git_bus_factor_over_time.png"),
+    )
+
+
+def plot_bus_factor_over_time(hotspot_authors, filename, renderer=None):
+    renderer = renderer or DEFAULT_RENDERER
+    with renderer.figure() as (fig, ax):
+        hotspot_authors.plot(kind="line", ax=ax)
+        ax.set_xlabel("month")
+        ax.set_ylabel(f"authors in last {BUS_FACTOR_WINDOW_MONTHS} months")
+        plt.setp(ax.get_xticklabels(), rotation=90)
+        legend = ax.legend(frameon=1)
+        frame = legend.get_frame()
+        frame.set_facecolor("white")
+        fig.tight_layout()
+        fig.savefig(filename)
 
 
-def create_bus_factor_chart(df, hotspots):
+def format_bus_factor_for_print(bus_factor):
+    text = "\n🚌 Knowledge loss risk in the last year\nLevel    Paths  Single owner\n"
+    for level in BUS_FACTOR_LEVELS:
+        level_bus_factor = bus_factor[bus_factor["level"] == level]
+        text = (
+            text
+            + f"{level:<6} {len(level_bus_factor):>7} {int(level_bus_factor['single_owner'].sum()):>13}\n"
+        )
+    return text
+
+
+def get_bus_factor_plot(df, cube, hotspots, output_dir="output", now=None):
+    if now is None:
+        now = datetime.now()
     top_hotspots = get_top_hotspots(hotspots)
     hotspot_files = [f.file for f in top_hotspots]
-    hotspot_commit_df = df[df["file"].isin(hotspot_files)]
-    without_github_user = hotspot_commit_df[hotspot_commit_df["author"] != "GitHub"]
-    recent_date = datetime.now() - timedelta(days=365)
-    recent_data = without_github_user[without_github_user["datetime"] >= recent_date]
+    # the chart counts whole days, the first one is the day after the cutoff
+    recent_date = pd.Timestamp(now - timedelta(days=365)).ceil("D")
+    recent_commit_df = get_time_window(df, since=recent_date)
+    hotspot_commit_df = recent_commit_df[recent_commit_df["file"].isin(hotspot_files)]
+    recent_data = hotspot_commit_df[hotspot_commit_df["author"] != "GitHub"]
 
-    hotspot_unique_author_counts = Histogram("file_abbr", "author", recent_data)
+    hotspot_unique_author_counts = Histogram(
+        "file_abbr", "author", cube.since(recent_date).isin("file", hotspot_files)
+    )
     hotspot_unique_author_counts.set_aggregation("unique_count")
     hotspot_unique_author_counts.set_chart_type("barh")
     hotspot_unique_author_counts.set_max_groupings(10)
-    hotspot_unique_author_counts.save_plot("output/git_histogram_bus_factor.png")
+    bus_factor_plot = hotspot_unique_author_counts.get_plot(
+        os.path.join(output_dir, "git_histogram_bus_factor.png")
+    )
 
     bus_factor_text = ""
-    for file in recent_data["file_abbr"].unique():
-        unique_authors = recent_data[recent_data["file_abbr"] == file][
-            "author"
-        ].unique()
-        if len(unique_authors) == 1:
-            bus_factor_text = bus_factor_text + f"{file:<50} - {unique_authors[0]}\n"
+    file_bus_factor = calculate_bus_factor(recent_data, ["file"])
+    single_owner_files = file_bus_factor[file_bus_factor["single_owner"]]
+    for file, author in zip(
+        single_owner_files["path"], single_owner_files["top_author"]
+    ):
+        bus_factor_text = (
+            bus_factor_text + f"{abbreviate_filename(file):<50} - {author}\n"
+        )
     if bus_factor_text != "":
         print("\n🚌 Hotspots with a high bus factor:")
         print(bus_factor_text)
+    return bus_factor_plot
+
+
+def calculate_change_coupling(
+    df,
+    max_commit_files=COUPLING_MAX_COMMIT_FILES,
+    min_shared_commits=COUPLING_MIN_SHARED_COMMITS,
+):
+    """
+    Finds the files that change together. The distinct commit and file codes of the rows are the sparse commit x file incidence matrix, and the co-change counts are the off-diagonal entries of its product with itself: the file pairs of every commit are expanded at once for all commits with the same number of files and counted with np.unique. Commits with more than max_commit_files files, e.g. mass reformats, are left out. Returns a frame of file, coupled_file, shared_commits, file_commits, coupled_file_commits and degree, the shared commits divided by the average commits of the two files, for the pairs with at least min_shared_commits shared commits sorted by degree.
+    """
+    files = df["file"].cat.categories
+    file_count = len(files)
+    incidence = pd.DataFrame(
+        {
+            "commit": df["commit_hash"].cat.codes.to_numpy(np.int64),
+            "file": df["file"].cat.codes.to_numpy(np.int64),
+        }
+    ).drop_duplicates()
+    commit_files = incidence.groupby("commit")["file"].transform("size").to_numpy()
+    is_capped = commit_files <= max_commit_files
+    incidence = incidence[is_capped].assign(size=commit_files[is_capped])
+    file_commits = np.bincount(incidence["file"].to_numpy(), minlength=file_count)
+
+    # sorted by file within a commit, so every pair has the lower file code first
+    incidence = incidence[incidence["size"] >= 2].sort_values(
+        ["size", "commit", "file"]
+    )
+    pair_counts = []
+    for size, size_incidence in incidence.groupby("size"):
+        commit_file_codes = size_incidence["file"].to_numpy().reshape(-1, size)
+        first, second = np.triu_indices(size, 1)
+        pair_keys = (
+            commit_file_codes[:, first] * file_count + commit_file_codes[:, second]
+        )
+        keys, counts = np.unique(pair_keys, return_counts=True)
+        pair_counts.append(pd.Series(counts, index=keys))
+    if len(pair_counts) == 0:
+        return pd.DataFrame(columns=COUPLING_COLUMNS)
+    shared_commits = pd.concat(pair_counts).groupby(level=0).sum()
+    shared_commits = shared_commits[shared_commits >= min_shared_commits]
+
+    first_files = shared_commits.index.to_numpy() // file_count
+    second_files = shared_commits.index.to_numpy() % file_count
+    coupling = pd.DataFrame(
+        {
+            "file": np.asarray(files, dtype=object)[first_files],
+            "coupled_file": np.asarray(files, dtype=object)[second_files],
+            "shared_commits": shared_commits.to_numpy(),
+            "file_commits": file_commits[first_files],
+            "coupled_file_commits": file_commits[second_files],
+        }
+    )
+    coupling["degree"] = (
+        coupling["shared_commits"]
+        / ((coupling["file_commits"] + coupling["coupled_file_commits"]) / 2)
+    ).round(3)
+    return coupling.sort_values(
+        ["degree", "shared_commits", "file", "coupled_file"],
+        ascending=[False, False, True, True],
+        ignore_index=True,
+    )[COUPLING_COLUMNS]
+
+
+def write_change_coupling_result(coupling, output_dir="output"):
+    coupling.head(COUPLING_TOP_PAIRS).to_csv(
+        os.path.join(output_dir, "git_change_coupling.csv"), index=False
+    )
+
 
+def write_directory_tree_result(directory_tree, output_dir="output"):
+    with open(os.path.join(output_dir, "git_directory_tree.json"), "w") as file:
+        json.dump(directory_tree.to_json(), file, indent=3)
 
-def create_html_file(csv_file, print_text):
+
+def format_change_coupling_for_print(coupling):
+    text = "\n🔗 Files changing together\nShared  Degree  Files\n"
+    for pair in coupling.head(COUPLING_TOP_PAIRS).itertuples():
+        text = (
+            text
+            + f"{pair.shared_commits:>5} {pair.degree:>7}  {pair.file} - {pair.coupled_file}\n"
+        )
+    text = text + "\n"
+    return text
+
+
+def create_html_file(csv_file, print_text, output_dir="output", coupling_text=""):
     html = f"""<html>
     <head>
         <title>Git Analysis - {csv_file}</title>
@@ -333,36 +1068,87 @@ def create_html_file(csv_file, print_text):
             <pre>
             {print_text}
             </pre>
+            The commits, churn, authors and summed hotspot score of every directory are nested in git_directory_tree.json for treemaps.<br/>
             <h3>Possible High Bus Factor:</h3>
             Show the number of unique authors per hotspot file in the last year. If a hotspot file only has one author for the last 365 day, it has a high "bus factor" if that person left the team.<br/>
             <img src="git_histogram_bus_factor.png"></img><br/>
+            <h3>Bus Factor Over Time:</h3>
+            Shows the number of unique authors per hotspot file in the {BUS_FACTOR_WINDOW_MONTHS} months up to each month. Every file and directory is in git_bus_factor_over_time.csv.<br/>
+            <img src="git_bus_factor_over_time.png"></img><br/>
+        <hr/>
+
+        <h2>Change Coupling</h2>
+            Shows the pairs of files that are most often changed in the same commit. Degree is the shared commits divided by the average commits of the two files. Commits with more than {COUPLING_MAX_COMMIT_FILES} files are left out.<br/>
+
+            <pre>
+            {coupling_text}
+            </pre>
 
     </body>
 </html>
 """
-    with open("output/results.html", "w") as file:
+    with open(os.path.join(output_dir, "results.html"), "w") as file:
         file.write(html)
 
 
-def do_analysis(csv_file, source_path):
-    df = read_git_log_csv(csv_file)
-    file_commits = calculate_file_commits(df)
-    commit_ages = get_commit_age(df, datetime.now())
+def do_analysis(
+    csv_file,
+    source_path,
+    output_dir="output",
+    complexity_source="working_tree",
+    revision="HEAD",
+    complexity_metric="size",
+    since=None,
+    until=None,
+):
+    """
+    Analyzes the commits from since up to until, both open when None. Ages and the trailing windows of the report are measured as of until, so a report with an until date doesn't change when it is run again later.
+    """
+    df = get_time_window(
+        sort_by_time(read_git_log(csv_file, ANALYSIS_COLUMNS)), since, until
+    )
+    if len(df) == 0:
+        print(
+            f"\n⚠️  No commits between {since or 'the first commit'} and {until or 'now'}\n"
+        )
+        return
+    now = datetime.now() if until is None else until
+    file_stats = calculate_file_stats(df, now)
     print("\n📅 Commit history")
-    print(f"\tRead file commits: {len(file_commits)}")
+    print(f"\tRead file commits: {len(file_stats)}")
 
-    file_complexities = calculate_file_complexity(source_path)
+    file_complexities = get_file_complexities(
+        source_path, complexity_source, revision, output_dir, complexity_metric
+    )
     print(f"\tRead file complexities: {len(file_complexities)}")
 
-    hotspot_data = determine_hotspot_data(file_commits, file_complexities, commit_ages)
-    write_csv_result(hotspot_data)
+    hotspot_data = determine_hotspot_data(file_stats, file_complexities)
+    write_csv_result(hotspot_data, output_dir)
     print_text = format_hotspot_for_print(hotspot_data)
     print(print_text)
+    directory_tree = DirectoryTree.from_frame(
+        df, {hotspot.file: hotspot.score for hotspot in hotspot_data}
+    )
+    write_directory_tree_result(directory_tree, output_dir)
+
+    bus_factor = calculate_bus_factor(get_recent_commits(df, now))
+    write_bus_factor_result(bus_factor, output_dir)
+    print(format_bus_factor_for_print(bus_factor))
+    bus_factor_over_time = calculate_bus_factor_over_time(df)
+    bus_factor_over_time.to_csv(
+        os.path.join(output_dir, "git_bus_factor_over_time.csv"), index=False
+    )
+    print(f"\tBus factor months: {bus_factor_over_time['month'].nunique()}")
+
+    coupling = calculate_change_coupling(df)
+    write_change_coupling_result(coupling, output_dir)
+    coupling_text = format_change_coupling_for_print(coupling)
+    print(coupling_text)
 
     print("📈 Creating graphs")
-    create_charts(df, hotspot_data)
+    create_charts(df, hotspot_data, output_dir, bus_factor_over_time, now=now)
 
-    create_html_file(source_path, print_text)
+    create_html_file(source_path, print_text, output_dir, coupling_text)
     print("\n✅  Done!\n\n")
 
 
@@ -0,0 +1,261 @@
+import argparse
+import contextlib
+import glob
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import traceback
+
+import matplotlib
+
+# charts are only saved to files, and workers have no display
+matplotlib.use("Agg")
+
+import analyze_git_csv
+import git_log_to_csv
+
+DEFAULT_EXCLUDE_FILE_PATTERN = "\.gem|\.lock|yarn|gemfile"
+DEFAULT_EXCLUDE_AUTHOR_PATTERN = "dependabot|github"
+
+
+def find_repos(repo_patterns):
+    repo_paths = []
+    for repo_pattern in repo_patterns:
+        for path in sorted(glob.glob(os.path.expanduser(repo_pattern))):
+            if is_git_repo(path) and path not in repo_paths:
+                repo_paths.append(path)
+    return repo_paths
+
+
+def is_git_repo(path):
+    """
+    A checkout has a .git directory or file, a bare repo like a mirror clone has HEAD and objects/ at its top.
+    """
+    if not os.path.isdir(path):
+        return False
+    return os.path.exists(os.path.join(path, ".git")) or (
+        os.path.isfile(os.path.join(path, "HEAD"))
+        and os.path.isdir(os.path.join(path, "objects"))
+    )
+
+
+def is_bare_repo(repo_path):
+    return not os.path.exists(os.path.join(repo_path, ".git"))
+
+
+def get_repo_output_dirs(repo_paths, output_root):
+    """
+    Gives every repo its own directory under output_root named after the repo, adding a number when two repos have the same name.
+    """
+    output_dirs = []
+    used_names = set()
+    for repo_path in repo_paths:
+        repo_name = os.path.basename(os.path.abspath(repo_path))
+        name = repo_name
+        number = 2
+        while name in used_names:
+            name = f"{repo_name}_{number}"
+            number = number + 1
+        used_names.add(name)
+        output_dirs.append(os.path.join(output_root, name))
+    return output_dirs
+
+
+def run_batch(
+    repo_paths,
+    output_root="output/batch",
+    workers=None,
+    exclude_file_pattern=DEFAULT_EXCLUDE_FILE_PATTERN,
+    exclude_author_pattern=DEFAULT_EXCLUDE_AUTHOR_PATTERN,
+    pull=False,
+    dataset_format="csv",
+    complexity_source="working_tree",
+    complexity_metric="size",
+):
+    if workers is None:
+        workers = os.cpu_count()
+    print(f"🗂️  Analyzing {len(repo_paths)} repos with {workers} workers")
+    start = time.time()
+    tasks = [
+        (
+            repo_path,
+            output_dir,
+            exclude_file_pattern,
+            exclude_author_pattern,
+            pull,
+            dataset_format,
+            complexity_source,
+            complexity_metric,
+        )
+        for repo_path, output_dir in zip(
+            repo_paths, get_repo_output_dirs(repo_paths, output_root)
+        )
+    ]
+    results = []
+    # a fresh process per repo so matplotlib and pandas memory is released between repos
+    with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(analyze_repo, tasks):
+            status_icon = "✅" if result["status"] == "ok" else "❌"
+            print(f"\t{status_icon} {result['repo']} {result['seconds']:.1f}s")
+            results.append(result)
+    results.sort(key=lambda result: repo_paths.index(result["repo"]))
+    summary = {
+        "workers": workers,
+        "seconds": round(time.time() - start, 3),
+        "repo_seconds": round(sum(result["seconds"] for result in results), 3),
+        "failed": sum(1 for result in results if result["status"] != "ok"),
+        "repos": results,
+    }
+    write_summary(summary, output_root)
+    print(
+        f"\n✅  Done with {len(results)} repos in {summary['seconds']:.1f}s, {summary['failed']} failed\n"
+    )
+    return summary
+
+
+def analyze_repo(task):
+    (
+        repo_path,
+        output_dir,
+        exclude_file_pattern,
+        exclude_author_pattern,
+        pull,
+        dataset_format,
+        complexity_source,
+        complexity_metric,
+    ) = task
+    result = {"repo": repo_path, "output_dir": output_dir, "status": "ok"}
+    timings = {}
+    start = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    bare = is_bare_repo(repo_path)
+    if bare:
+        # a mirror has no working tree to pull into or to measure
+        complexity_source = "git"
+    # each repo logs to its own file so the output of parallel repos doesn't interleave
+    with open(os.path.join(output_dir, "log.txt"), "w") as log_file:
+        with contextlib.redirect_stdout(log_file):
+            try:
+                if pull:
+                    subprocess.run(
+                        ["git", "-C", repo_path]
+                        + (["remote", "update", "--prune"] if bare else ["pull"]),
+                        check=True,
+                        stdout=log_file,
+                        stderr=subprocess.STDOUT,
+                    )
+                    timings["pull"] = round(time.time() - start, 3)
+
+                stage_start = time.time()
+                dataset_filename = os.path.join(output_dir, f"git_log.{dataset_format}")
+                git_log_to_csv.create_csv_from_repo(
+                    repo_path,
+                    exclude_file_pattern,
+                    exclude_author_pattern,
+                    dataset_filename,
+                )
+                timings["log"] = round(time.time() - stage_start, 3)
+
+                stage_start = time.time()
+                analyze_git_csv.do_analysis(
+                    dataset_filename,
+                    os.path.abspath(repo_path),
+                    output_dir,
+                    complexity_source,
+                    complexity_metric=complexity_metric,
+                )
+                timings["analysis"] = round(time.time() - stage_start, 3)
+            except Exception as e:
+                traceback.print_exc(file=log_file)
+                result["status"] = "failed"
+                result["error"] = f"{type(e).__name__}: {e}"
+                # e.g. git's "fatal: cannot change to" of a missing repo
+                if getattr(e, "stderr", None):
+                    result["error"] = f"{result['error']} {e.stderr.strip()}"
+    result["timings"] = timings
+    result["seconds"] = round(time.time() - start, 3)
+    return result
+
+
+def write_summary(summary, output_root):
+    os.makedirs(output_root, exist_ok=True)
+    with open(os.path.join(output_root, "summary.json"), "w") as file:
+        json.dump(summary, file, indent=3)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "repos",
+        type=str,
+        nargs="+",
+        help="paths or glob patterns of the git repositories to analyze, e.g. '../*'",
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        help="directory that gets one output directory per repo and summary.json",
+        default="output/batch",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of repos analyzed at the same time, defaults to the number of cores",
+        default=None,
+    )
+    parser.add_argument(
+        "--exclude_file_pattern",
+        type=str,
+        help="pattern of files to exclude",
+        default=DEFAULT_EXCLUDE_FILE_PATTERN,
+    )
+    parser.add_argument(
+        "--exclude_author_pattern",
+        type=str,
+        help="pattern of authors to exclude",
+        default=DEFAULT_EXCLUDE_AUTHOR_PATTERN,
+    )
+    parser.add_argument(
+        "--pull",
+        action="store_true",
+        help="git pull every repo before reading its log",
+    )
+    parser.add_argument(
+        "--dataset_format",
+        type=str,
+        choices=["csv", "npz"],
+        help="format of the parsed git log dataset written to each repo's output directory",
+        default="csv",
+    )
+    parser.add_argument(
+        "--complexity_source",
+        type=str,
+        choices=analyze_git_csv.COMPLEXITY_SOURCES,
+        help="read hotspot file sizes from each repo's working tree or from its HEAD git tree, bare mirrors always use their git tree",
+        default="working_tree",
+    )
+    parser.add_argument(
+        "--complexity_metric",
+        type=str,
+        choices=analyze_git_csv.COMPLEXITY_METRICS,
+        help="hotspot complexity of a file, size in bytes, logical lines or whitespace complexity",
+        default="size",
+    )
+    args = parser.parse_args()
+
+    summary = run_batch(
+        find_repos(args.repos),
+        args.output_dir,
+        args.workers,
+        args.exclude_file_pattern,
+        args.exclude_author_pattern,
+        args.pull,
+        args.dataset_format,
+        args.complexity_source,
+        args.complexity_metric,
+    )
+    if summary["failed"] > 0:
+        sys.exit(1)
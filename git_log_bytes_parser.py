@@ -0,0 +1,154 @@
+import locale
+import mmap
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+LOG_SLICE_SIZE = 16 * 1024 * 1024
+TIMEZONE_OFFSET_PATTERN = re.compile(rb"[+\-][0-9][0-9]:[0-9][0-9]$")
+
+ParsedCommit = namedtuple("ParsedCommit", "commit_hash epoch timestamp author files")
+ParsedFile = namedtuple("ParsedFile", "file dirs csv_file csv_dirs")
+
+
+def read_log_slices(filename, start=0, end=None, slice_size=LOG_SLICE_SIZE):
+    """
+    Memory maps the log file and yields [start, end) in slices that each end right before a "^^" at the start of a line, so every slice holds whole commits.
+    """
+    if end is None:
+        end = os.path.getsize(filename)
+    if end <= start:
+        return
+    with open(filename, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as log:
+            while start < end:
+                boundary = log.find(b"\n^^", start + slice_size, end)
+                slice_end = end if boundary == -1 else boundary + 1
+                yield log[start:slice_end]
+                start = slice_end
+
+
+def parse_log_slices(log_slices, classifier, checkpoint):
+    """
+    Yields a list of ParsedCommits per slice. Lines are split as bytes, and authors and files are only decoded and classified the first time each distinct value is seen, in LRU caches added to the classifier.
+    """
+    encoding = locale.getpreferredencoding(False)
+
+    def get_author(author_bytes):
+        author = author_bytes.decode(encoding)
+        return author if classifier.include_author(author) else None
+
+    def get_parsed_file(file_bytes):
+        file = file_bytes.decode(encoding)
+        dirs = classifier.classify_file(file)
+        if dirs is None:
+            return None
+        return ParsedFile(file, dirs, f'"{file}",', "," + ",".join(dirs) + "\n")
+
+    get_author = classifier.add_cache("encoded authors", get_author)
+    get_parsed_file = classifier.add_cache("encoded files", get_parsed_file)
+
+    churn_values = {}
+    for log in log_slices:
+        if b"\r" in log:
+            # same universal newlines handling as reading the log in text mode
+            log = log.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        commits = []
+        for commit in log.split(b"^^"):
+            if commit == b"":
+                continue
+            commit_basics_parts = commit[: commit.find(b"\n")].split(b"--")
+            hash = commit_basics_parts[0].decode(encoding)
+            epoch = int(commit_basics_parts[1])
+            if not checkpoint.is_new(hash):
+                continue
+            checkpoint.record(hash, epoch)
+
+            author = get_author(commit_basics_parts[3])
+            if author is None:
+                continue
+
+            churn_fields = split_churn_fields(commit)
+            try:
+                commit_files = get_commit_files(
+                    churn_fields, get_parsed_file, churn_values
+                )
+            except KeyError:
+                for text_number in churn_fields[0::3] + churn_fields[1::3]:
+                    if text_number not in churn_values:
+                        churn_values[text_number] = get_churn_value(text_number)
+                commit_files = get_commit_files(
+                    churn_fields, get_parsed_file, churn_values
+                )
+
+            timestamp = TIMEZONE_OFFSET_PATTERN.sub(b"", commit_basics_parts[2])
+            commits.append(
+                ParsedCommit(
+                    hash, epoch, timestamp.decode(encoding), author, commit_files
+                )
+            )
+        yield commits
+
+
+def split_churn_fields(commit):
+    """
+    Returns the insertions, deletions and file fields of the churn lines as one flat list, the same lines as commit_lines[3:-1] of the text parser.
+    """
+    start = 0
+    for _ in range(3):
+        start = commit.find(b"\n", start) + 1
+        if start == 0:
+            return []
+    end = commit.rfind(b"\n")
+    if end < start:
+        return []
+    churn_fields = commit[start:end].replace(b"\n", b"\t").split(b"\t")
+    if len(churn_fields) % 3 != 0:
+        raise ValueError(f"Unexpected churn line in commit: {commit[:80]!r}")
+    return churn_fields
+
+
+def get_commit_files(churn_fields, get_parsed_file, churn_values):
+    fields = iter(churn_fields)
+    return [
+        (parsed_file, churn_values[insertions] + churn_values[deletions])
+        for insertions, deletions, file in zip(fields, fields, fields)
+        if (parsed_file := get_parsed_file(file)) is not None
+    ]
+
+
+def get_churn_value(text_number):
+    if text_number.strip() == b"-":
+        return 1
+    return int(text_number)
+
+
+def get_commit_dates(commits):
+    """
+    Returns the year, month and day arrays of the commits' timestamps, computed for the whole batch at once with datetime64 arithmetic.
+    """
+    days = np.array([commit.timestamp for commit in commits], dtype="datetime64[D]")
+    months = days.astype("datetime64[M]")
+    return (
+        (days.astype("datetime64[Y]").astype(int) + 1970).tolist(),
+        (months.astype(int) % 12 + 1).tolist(),
+        ((days - months).astype(int) + 1).tolist(),
+    )
+
+
+def format_csv_commits(commits):
+    if not commits:
+        return ""
+    years, months, days = get_commit_dates(commits)
+    csv_lines = []
+    for commit, year, month, day in zip(commits, years, months, days):
+        prefix = f'{commit.commit_hash},{commit.epoch},{commit.timestamp},{commit.timestamp[:10]},{year},{month},{day},"{commit.author}",'
+        csv_lines.extend(
+            [
+                f"{prefix}{parsed_file.csv_file}{churn}{parsed_file.csv_dirs}"
+                for parsed_file, churn in commit.files
+            ]
+        )
+    return "".join(csv_lines)
@@ -1,22 +1,448 @@
 import argparse
+import io
+import mmap
+import multiprocessing
+import os
 import re
+import subprocess
 import sys
+import tempfile
+from collections import deque, namedtuple
 from datetime import datetime
 
+import git_log_bytes_parser
+from CommitCheckpoint import CommitCheckpoint
+from GitLogDataset import GitLogDataset
+from PathClassifier import PathClassifier
 
-def create_csv(filename, exclude_file_pattern, exclude_author_pattern):
+CSV_HEADER = "commit_hash,epoch,timestamp,date,year,month,day,author,file,churn_count,dir_1,dir_2,dir_3,dir_4\n"
+GIT_LOG_FORMAT = "^^%H--%ct--%cI--%an%n"
+PARSERS = ["text", "mmap"]
+READ_CHUNK_SIZE = 1024 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+
+GitLogRow = namedtuple(
+    "GitLogRow",
+    "commit_hash epoch timestamp date year month day author file churn_count dir_1 dir_2 dir_3 dir_4",
+)
+
+
+def create_csv(
+    filename,
+    exclude_file_pattern,
+    exclude_author_pattern,
+    output_filename="output/git_log.csv",
+    incremental=False,
+    workers=1,
+    parser="text",
+):
     print(f"exclude_author_pattern:{exclude_author_pattern}")
     print(f"🗓️  Reading git log: {filename}")
-    git_log_text = ""
-    with open(filename, "r") as file:
-        git_log_text = file.read()
+    checkpoint, append = load_checkpoint(output_filename, incremental)
+    dataset_format = get_dataset_format(output_filename)
+    if workers > 1:
+        chunks = [
+            (
+                filename,
+                start,
+                end,
+                exclude_file_pattern,
+                exclude_author_pattern,
+                dataset_format,
+                parser,
+            )
+            for start, end in find_commit_chunk_offsets(filename, workers)
+        ]
+        dataset_chunks = parse_chunks_in_parallel(
+            parse_git_log_file_chunk, chunks, checkpoint, workers
+        )
+        write_dataset(dataset_chunks, output_filename, append)
+    elif parser == "mmap":
+        classifier = PathClassifier(exclude_file_pattern, exclude_author_pattern)
+        commit_batches = git_log_bytes_parser.parse_log_slices(
+            git_log_bytes_parser.read_log_slices(filename), classifier, checkpoint
+        )
+        write_dataset(
+            format_commit_batches(commit_batches, dataset_format),
+            output_filename,
+            append,
+        )
+        print(f"\t{classifier.format_cache_info()}")
+    else:
+        classifier = PathClassifier(exclude_file_pattern, exclude_author_pattern)
+        with open(filename, "r") as file:
+            rows = parse_new_commits(read_commit_blocks(file), classifier, checkpoint)
+            write_dataset(
+                format_dataset_chunks(rows, dataset_format),
+                output_filename,
+                append,
+            )
+        print(f"\t{classifier.format_cache_info()}")
+    save_checkpoint(checkpoint, output_filename, incremental)
+
+
+def create_csv_from_repo(
+    repo_path,
+    exclude_file_pattern,
+    exclude_author_pattern,
+    output_filename="output/git_log.csv",
+    incremental=False,
+    workers=1,
+):
+    print(f"exclude_author_pattern:{exclude_author_pattern}")
+    print(f"🗓️  Reading git log from repo: {repo_path}")
+    checkpoint, append = load_checkpoint(output_filename, incremental, from_repo=True)
+    dataset_format = get_dataset_format(output_filename)
+    ingested_tips = checkpoint.tips or []
+    tips = get_ref_tips(repo_path)
+    checkpoint.tips = tips
+    if not tips:
+        # a repo without commits, git log would fail on the missing HEAD
+        write_dataset([], output_filename, append)
+        save_checkpoint(checkpoint, output_filename, incremental)
+        return
+    # a file instead of a pipe, git can't block on a full stderr pipe while stdout is read
+    git_errors = tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace")
+    with git_errors, subprocess.Popen(
+        get_git_log_command(repo_path),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=git_errors,
+        encoding="utf-8",
+        errors="replace",
+    ) as git_log:
+        # git reads all revisions from stdin before it writes any commit
+        git_log.stdin.write(get_git_log_revisions(tips, ingested_tips))
+        git_log.stdin.close()
+        commit_blocks = read_commit_blocks(git_log.stdout)
+        if workers > 1:
+            chunks = (
+                (batch, exclude_file_pattern, exclude_author_pattern, dataset_format)
+                for batch in batch_commit_blocks(commit_blocks)
+            )
+            dataset_chunks = parse_chunks_in_parallel(
+                parse_commit_blocks_chunk, chunks, checkpoint, workers
+            )
+        else:
+            classifier = PathClassifier(exclude_file_pattern, exclude_author_pattern)
+            rows = parse_new_commits(commit_blocks, classifier, checkpoint)
+            dataset_chunks = format_dataset_chunks(rows, dataset_format)
+        write_dataset(dataset_chunks, output_filename, append)
+        git_log.wait()
+        git_errors.seek(0)
+        check_git_result(git_log.returncode, git_log.args, git_errors.read())
+    save_checkpoint(checkpoint, output_filename, incremental)
+
+
+def get_ref_tips(repo_path):
+    """
+    Returns the commits all refs point to, the same commits git log --all starts from.
+    """
+    command = ["git", "-C", repo_path, "rev-parse", "--all"]
+    result = subprocess.run(command, capture_output=True, encoding="utf-8")
+    check_git_result(result.returncode, command, result.stderr)
+    return sorted(set(result.stdout.split()))
+
+
+def check_git_result(returncode, command, error_text):
+    # printed so a redirected stdout, like the batch log.txt files, has git's messages
+    if error_text:
+        print(error_text, end="")
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, stderr=error_text)
+
+
+def get_git_log_command(repo_path):
+    return [
+        "git",
+        "-C",
+        repo_path,
+        "log",
+        "--reverse",
+        "-M",
+        "-C",
+        "--numstat",
+        f"--format={GIT_LOG_FORMAT}",
+        "--stdin",
+    ]
+
+
+def get_git_log_revisions(tips, ingested_tips):
+    """
+    The revisions git log reads from stdin: the commits reachable from the current ref tips but not from the tips of the last run, whatever their dates. stdin because repos can have more refs than fit on a command line.
+    """
+    return "".join(
+        [f"{tip}\n" for tip in tips] + [f"^{tip}\n" for tip in ingested_tips]
+    )
+
+
+def get_checkpoint_filename(output_filename):
+    # the full name, git_log.csv and git_log.npz are different datasets
+    return output_filename + ".checkpoint.json"
+
+
+def load_checkpoint(output_filename, incremental, from_repo=False):
+    """
+    A repo checkpoint has the ref tips and a log file checkpoint the ingested hashes, a checkpoint of the other kind or of an older version can't tell which commits are new, so the dataset is built again.
+    """
+    checkpoint_filename = get_checkpoint_filename(output_filename)
+    if (
+        incremental
+        and os.path.exists(output_filename)
+        and os.path.exists(checkpoint_filename)
+    ):
+        checkpoint = CommitCheckpoint.load(checkpoint_filename)
+        if checkpoint is None or (checkpoint.tips is not None) != from_repo:
+            print("\tRebuilding the dataset, the checkpoint is of another source")
+            return CommitCheckpoint(), False
+        # full hashes are only shortened for display
+        print(f"\tAppending commits not in: {checkpoint.commit_hash[:7]} and earlier")
+        return checkpoint, True
+    return CommitCheckpoint(), False
+
+
+def get_dataset_format(output_filename):
+    if output_filename.endswith(".npz"):
+        return "npz"
+    return "csv"
+
+
+def format_dataset_chunks(rows, dataset_format):
+    if dataset_format == "npz":
+        return [GitLogDataset.from_rows(rows)]
+    return map(format_csv_row, rows)
+
+
+def format_commit_batches(commit_batches, dataset_format):
+    for commits in commit_batches:
+        yield format_commit_batch(commits, dataset_format)
+
+
+def format_commit_batch(commits, dataset_format):
+    if dataset_format == "npz":
+        return GitLogDataset.from_rows(get_parsed_commit_rows(commits))
+    return git_log_bytes_parser.format_csv_commits(commits)
+
+
+def get_parsed_commit_rows(commits):
+    if not commits:
+        return
+    years, months, days = git_log_bytes_parser.get_commit_dates(commits)
+    for commit, year, month, day in zip(commits, years, months, days):
+        for parsed_file, churn in commit.files:
+            yield GitLogRow(
+                commit.commit_hash,
+                str(commit.epoch),
+                commit.timestamp,
+                commit.timestamp[:10],
+                year,
+                month,
+                day,
+                commit.author,
+                parsed_file.file,
+                churn,
+                *parsed_file.dirs,
+            )
+
+
+def format_dataset_chunk(rows, dataset_format):
+    if dataset_format == "npz":
+        return GitLogDataset.from_rows(rows)
+    return "".join(map(format_csv_row, rows))
+
+
+def write_dataset(dataset_chunks, output_filename, append=False):
+    if get_dataset_format(output_filename) == "npz":
+        write_npz(dataset_chunks, output_filename, append)
+    else:
+        write_csv(dataset_chunks, output_filename, append)
+
+
+def save_checkpoint(checkpoint, output_filename, incremental):
+    """
+    Only incremental runs save the checkpoint of the dataset they wrote. Any other run that rewrites the dataset removes its checkpoint, which described the earlier contents.
+    """
+    if incremental:
+        checkpoint.save(get_checkpoint_filename(output_filename))
+    else:
+        remove_checkpoint(output_filename)
 
-    csv_data = process_git_log(
-        git_log_text, exclude_file_pattern, exclude_author_pattern
+
+def remove_checkpoint(output_filename):
+    checkpoint_filename = get_checkpoint_filename(output_filename)
+    if os.path.exists(checkpoint_filename):
+        os.remove(checkpoint_filename)
+
+
+def parse_new_commits(commit_blocks, classifier, checkpoint):
+    return parse_git_log(
+        skip_ingested_commits(commit_blocks, checkpoint), classifier=classifier
+    )
+
+
+def skip_ingested_commits(commit_blocks, checkpoint):
+    for commit in commit_blocks:
+        if commit != "":
+            commit_basics_parts = commit.split("\n", 1)[0].split("--")
+            hash = commit_basics_parts[0]
+            epoch = int(commit_basics_parts[1])
+            if checkpoint.is_new(hash):
+                checkpoint.record(hash, epoch)
+                yield commit
+
+
+def read_commit_blocks(file, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields the same "^^" separated commit blocks as file.read().split("^^") while only holding one chunk plus the current commit in memory. Only the new chunk is split, the pieces of a commit spanning several chunks are joined once when it ends, so huge commits aren't split again per chunk.
+    """
+    pieces = []
+    # a trailing "^" of a chunk may start a "^^" split across two reads
+    carry = ""
+    while True:
+        chunk = file.read(chunk_size)
+        if chunk == "":
+            break
+        blocks = (carry + chunk).split("^^")
+        tail = blocks.pop()
+        if blocks:
+            pieces.append(blocks[0])
+            yield "".join(pieces)
+            yield from blocks[1:]
+            pieces = []
+        carry = "^" if tail.endswith("^") else ""
+        pieces.append(tail[: len(tail) - len(carry)])
+    yield "".join(pieces) + carry
+
+
+def find_commit_chunk_offsets(filename, workers):
+    """
+    Splits the log file into (start, end) byte ranges that each begin at a "^^" right after a newline, so every range holds whole commits and splits on "^^" exactly like the full file does.
+    """
+    file_size = os.path.getsize(filename)
+    chunk_count = max(workers * 4, file_size // PARALLEL_CHUNK_SIZE + 1)
+    offsets = [0]
+    if file_size > 0:
+        with open(filename, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as log:
+                for number in range(1, chunk_count):
+                    target = max(file_size * number // chunk_count, offsets[-1])
+                    boundary = log.find(b"\n^^", target)
+                    if boundary == -1:
+                        break
+                    if boundary + 1 > offsets[-1]:
+                        offsets.append(boundary + 1)
+    offsets.append(file_size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def batch_commit_blocks(commit_blocks, batch_size=PARALLEL_CHUNK_SIZE):
+    batch = []
+    batch_chars = 0
+    for commit in commit_blocks:
+        batch.append(commit)
+        batch_chars = batch_chars + len(commit)
+        if batch_chars >= batch_size:
+            yield batch
+            batch = []
+            batch_chars = 0
+    if batch:
+        yield batch
+
+
+def parse_chunks_in_parallel(worker, chunks, checkpoint, workers):
+    """
+    Parses the chunks in a process pool and yields their csv text or GitLogDataset in the original commit order. Only a couple of chunks per worker are in flight at once so memory stays bounded.
+    """
+    with multiprocessing.Pool(workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(worker, (chunk + (checkpoint,),)))
+            if len(pending) >= workers * 2:
+                yield merge_chunk_result(pending.popleft().get(), checkpoint)
+        while pending:
+            yield merge_chunk_result(pending.popleft().get(), checkpoint)
+
+
+def merge_chunk_result(chunk_result, checkpoint):
+    dataset_chunk, chunk_checkpoint = chunk_result
+    checkpoint.merge(chunk_checkpoint)
+    return dataset_chunk
+
+
+def parse_git_log_file_chunk(chunk):
+    (
+        filename,
+        start,
+        end,
+        exclude_file_pattern,
+        exclude_author_pattern,
+        dataset_format,
+        parser,
+        checkpoint,
+    ) = chunk
+    if parser == "mmap":
+        commit_batches = git_log_bytes_parser.parse_log_slices(
+            git_log_bytes_parser.read_log_slices(filename, start, end, end - start),
+            PathClassifier(exclude_file_pattern, exclude_author_pattern),
+            checkpoint,
+        )
+        commits = [commit for commits in commit_batches for commit in commits]
+        return format_commit_batch(commits, dataset_format), checkpoint
+    with open(filename, "rb") as file:
+        file.seek(start)
+        chunk_bytes = file.read(end - start)
+    # decode the same way open(filename, "r") does for the serial parser
+    log = io.TextIOWrapper(io.BytesIO(chunk_bytes)).read()
+    return parse_commit_blocks_chunk(
+        (
+            log.split("^^"),
+            exclude_file_pattern,
+            exclude_author_pattern,
+            dataset_format,
+            checkpoint,
+        )
     )
 
-    with open("output/git_log.csv", "w") as file:
-        file.write(csv_data)
+
+def parse_commit_blocks_chunk(chunk):
+    (
+        commit_blocks,
+        exclude_file_pattern,
+        exclude_author_pattern,
+        dataset_format,
+        checkpoint,
+    ) = chunk
+    classifier = PathClassifier(exclude_file_pattern, exclude_author_pattern)
+    rows = parse_new_commits(commit_blocks, classifier, checkpoint)
+    return format_dataset_chunk(rows, dataset_format), checkpoint
+
+
+def write_csv(csv_lines, output_filename, append=False):
+    mode = "a" if append else "w"
+    with open(output_filename, mode, buffering=WRITE_BUFFER_SIZE) as file:
+        if not append:
+            file.write(CSV_HEADER)
+        file.writelines(csv_lines)
+
+
+def write_npz(dataset_chunks, output_filename, append=False):
+    dataset = GitLogDataset()
+    if append:
+        dataset = GitLogDataset.load(output_filename)
+    for dataset_chunk in dataset_chunks:
+        dataset.extend(dataset_chunk)
+    dataset.save(output_filename)
+
+
+def export_csv(npz_filename, output_filename):
+    print(f"🗓️  Exporting {npz_filename} to {output_filename}")
+    write_csv(GitLogDataset.load(npz_filename).to_csv_lines(), output_filename)
+    remove_checkpoint(output_filename)
+
+
+def format_csv_row(row):
+    return f'{row.commit_hash},{row.epoch},{row.timestamp},{row.date},{row.year},{row.month},{row.day},"{row.author}","{row.file}",{row.churn_count},{row.dir_1},{row.dir_2},{row.dir_3},{row.dir_4}\n'
 
 
 def strip_timezone_offset(timestamp_str):
@@ -50,47 +476,67 @@ def get_first_directories_from_filename(file):
 
 
 def process_git_log(log, exclude_file_pattern="", exclude_author_pattern=""):
-    commits = log.split("^^")
+    rows = parse_git_log(log.split("^^"), exclude_file_pattern, exclude_author_pattern)
+    return CSV_HEADER + "".join(format_csv_row(row) for row in rows)
+
 
-    result = "commit_hash,epoch,timestamp,date,year,month,day,author,file,churn_count,dir_1,dir_2,dir_3,dir_4\n"
-    for number, commit in enumerate(commits):
+def parse_git_log(
+    commit_blocks, exclude_file_pattern="", exclude_author_pattern="", classifier=None
+):
+    if classifier is None:
+        classifier = PathClassifier(exclude_file_pattern, exclude_author_pattern)
+    for commit in commit_blocks:
         if commit != "":
-            commit_lines = commit.split("\n")
-            commit_basics = commit_lines[0]
-            commit_basics_parts = commit_basics.split("--")
-            hash = commit_basics_parts[0]
-            epoch = commit_basics_parts[1]
-            tmsp = commit_basics_parts[2]
-
-            # 2019-12-17T09:16:10-05:00
-            # yyyy-mm-ddT
-            tmsp = strip_timezone_offset(tmsp)
-            tmsp_date = datetime.strptime(tmsp, "%Y-%m-%dT%H:%M:%S")
-            day_only = tmsp_date.date()
-            year = tmsp_date.year
-            month = tmsp_date.month
-            day = tmsp_date.day
-
-            author = commit_basics_parts[3]
-            if include_author(author, exclude_author_pattern):
-                total_lines = len(commit_lines)
-                for row_index in range(3, total_lines - 1):
-                    churn_line = commit_lines[row_index]
-                    churn_line_parts = churn_line.split("\t")
-                    insertions = get_churn_int_values_even_if_dash(churn_line_parts[0])
-                    deletions = get_churn_int_values_even_if_dash(churn_line_parts[1])
-                    total_churn = insertions + deletions
-
-                    file = churn_line_parts[2]
-                    if include_file(file, exclude_file_pattern):
-                        dirs = get_first_directories_from_filename(file)
-
-                        result = (
-                            result
-                            + f'{hash},{epoch},{tmsp},{day_only},{year},{month},{day},"{author}","{file}",{total_churn},{dirs[0]},{dirs[1]},{dirs[2]},{dirs[3]}\n'
-                        )
-
-    return result
+            yield from parse_commit_block(commit, classifier=classifier)
+
+
+def parse_commit_block(
+    commit, exclude_file_pattern="", exclude_author_pattern="", classifier=None
+):
+    if classifier is None:
+        classifier = PathClassifier(exclude_file_pattern, exclude_author_pattern)
+    commit_lines = commit.split("\n")
+    commit_basics = commit_lines[0]
+    commit_basics_parts = commit_basics.split("--")
+    hash = commit_basics_parts[0]
+    epoch = commit_basics_parts[1]
+    tmsp = commit_basics_parts[2]
+
+    # 2019-12-17T09:16:10-05:00
+    # yyyy-mm-ddT
+    tmsp = strip_timezone_offset(tmsp)
+    tmsp_date = datetime.strptime(tmsp, "%Y-%m-%dT%H:%M:%S")
+    day_only = tmsp_date.date()
+    year = tmsp_date.year
+    month = tmsp_date.month
+    day = tmsp_date.day
+
+    author = commit_basics_parts[3]
+    if classifier.include_author(author):
+        total_lines = len(commit_lines)
+        for row_index in range(3, total_lines - 1):
+            churn_line = commit_lines[row_index]
+            churn_line_parts = churn_line.split("\t")
+            insertions = get_churn_int_values_even_if_dash(churn_line_parts[0])
+            deletions = get_churn_int_values_even_if_dash(churn_line_parts[1])
+            total_churn = insertions + deletions
+
+            file = churn_line_parts[2]
+            dirs = classifier.classify_file(file)
+            if dirs is not None:
+                yield GitLogRow(
+                    hash,
+                    epoch,
+                    tmsp,
+                    day_only,
+                    year,
+                    month,
+                    day,
+                    author,
+                    file,
+                    total_churn,
+                    *dirs,
+                )
 
 
 def include_file(file, exclude_file_pattern):
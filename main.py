@@ -1,16 +1,18 @@
 import argparse
 import os
 import sys
+from datetime import datetime
 
 import analyze_git_csv
 import git_log_to_csv
+import query_server
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "filename",
         type=str,
-        help="filename of the csv logfile",
+        help="filename of the git log text file or path of a git repository to read the log from directly",
     )
     parser.add_argument(
         "--exclude_file_pattern",
@@ -24,14 +26,124 @@ if __name__ == "__main__":
         help="pattern of authors to exclude",
         default="dependabot|github",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only parse commits newer than the last run and append them to the dataset in output/",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of processes used to parse the git log",
+        default=1,
+    )
+    parser.add_argument(
+        "--parser",
+        type=str,
+        choices=git_log_to_csv.PARSERS,
+        help="parser used for git log text files, mmap scans the memory mapped file as bytes and is several times faster on large logs",
+        default="text",
+    )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--dataset_format",
+        type=str,
+        choices=["csv", "npz"],
+        help="format of the parsed git log dataset written to output/",
+        default="csv",
+    )
+    parser.add_argument(
+        "--complexity_source",
+        type=str,
+        choices=analyze_git_csv.COMPLEXITY_SOURCES,
+        help="read hotspot file sizes from the checked out working tree or from the git tree of --revision, which also works for bare mirrors",
+        default="working_tree",
+    )
+    parser.add_argument(
+        "--complexity_metric",
+        type=str,
+        choices=analyze_git_csv.COMPLEXITY_METRICS,
+        help="hotspot complexity of a file, size in bytes, logical lines or whitespace complexity (total indentation of the logical lines)",
+        default="size",
+    )
+    parser.add_argument(
+        "--revision",
+        type=str,
+        help="revision whose git tree is used with --complexity_source git",
+        default="HEAD",
+    )
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="only analyze commits at or after this date or time, e.g. 2021-01-01",
+    )
+    parser.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="only analyze commits before this date or time, ages and the trailing 30 and 365 day windows are measured as of it for reproducible reports",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="instead of writing the report, load the history once and serve JSON queries on localhost until stopped with Ctrl+C",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="port of the local query server started with --serve",
+        default=query_server.DEFAULT_PORT,
+    )
+    parser.add_argument(
+        "--export_csv",
+        action="store_true",
+        help="also export the npz dataset to output/git_log.csv",
+    )
 
-    filename_path = os.path.dirname(args.filename)
-    source_abs_path = os.path.abspath(filename_path)
-    print(source_abs_path)
+    args = parser.parse_args()
+    dataset_filename = f"output/git_log.{args.dataset_format}"
 
-    git_log_to_csv.create_csv(
-        args.filename, args.exclude_file_pattern, args.exclude_author_pattern
-    )
-    analyze_git_csv.do_analysis("output/git_log.csv", source_abs_path)
+    if os.path.isdir(args.filename):
+        source_abs_path = os.path.abspath(args.filename)
+        print(source_abs_path)
+        git_log_to_csv.create_csv_from_repo(
+            args.filename,
+            args.exclude_file_pattern,
+            args.exclude_author_pattern,
+            dataset_filename,
+            incremental=args.incremental,
+            workers=args.workers,
+        )
+    else:
+        filename_path = os.path.dirname(args.filename)
+        source_abs_path = os.path.abspath(filename_path)
+        print(source_abs_path)
+        git_log_to_csv.create_csv(
+            args.filename,
+            args.exclude_file_pattern,
+            args.exclude_author_pattern,
+            dataset_filename,
+            incremental=args.incremental,
+            workers=args.workers,
+            parser=args.parser,
+        )
+    if args.dataset_format == "npz" and args.export_csv:
+        git_log_to_csv.export_csv(dataset_filename, "output/git_log.csv")
+    if args.serve:
+        history = query_server.GitHistory.load(
+            dataset_filename,
+            source_abs_path,
+            complexity_source=args.complexity_source,
+            revision=args.revision,
+            complexity_metric=args.complexity_metric,
+        )
+        query_server.serve(history, args.port)
+    else:
+        analyze_git_csv.do_analysis(
+            dataset_filename,
+            source_abs_path,
+            complexity_source=args.complexity_source,
+            revision=args.revision,
+            complexity_metric=args.complexity_metric,
+            since=args.since,
+            until=args.until,
+        )
@@ -4,12 +4,10 @@ cd ../$repo_dir_name
 echo "Get the latest code for $repo_dir_name"
 git pull
 
-echo "Create the log csv"
-git log --reverse --all -M -C --numstat --format="^^%h--%ct--%cI--%an%n" > git_log.txt
 cd ../git-log-analytics/
 
 echo "Analyze the log"
-python3 main.py ../$repo_dir_name/git_log.txt
+python3 main.py ../$repo_dir_name
 
 open output/results.html
 
@@ -0,0 +1,212 @@
+import functools
+import json
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pandas as pd
+
+import analyze_git_csv
+from DateHistogram import DateHistogram
+from DirectoryTree import DirectoryTree
+from Histogram import Histogram
+
+HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+QUERY_CACHE_SIZE = 1024
+DIRECTORY_TREE_CACHE_SIZE = 8
+ENDPOINTS = [
+    "window",
+    "hotspots",
+    "histogram",
+    "date_histogram",
+    "bus_factor",
+    "directories",
+]
+
+
+class GitHistory:
+    """
+    The parsed git log loaded once for answering queries. Every endpoint takes since and until, which are sliced from the timestamp sorted rows with a binary search, and its answers are cached per query, so repeated dashboard queries don't group the rows again. Ages and the bus factor year are measured as of until, or as of the time the history was loaded.
+    """
+
+    def __init__(self, df, file_complexities, now=None, cache_size=QUERY_CACHE_SIZE):
+        df = analyze_git_csv.sort_by_time(df)
+        df["two_dirs"] = analyze_git_csv.join_columns(df, "dir_1", "dir_2")
+        df["datetime"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+        df["month"] = df["datetime"].dt.to_period("M")
+        self.df = df
+        self.file_complexities = file_complexities
+        self.now = datetime.now() if now is None else now
+        self.query = functools.lru_cache(maxsize=cache_size)(self._query)
+        # drilling into directories reuses the tree of the time window
+        self._get_directory_tree = functools.lru_cache(
+            maxsize=DIRECTORY_TREE_CACHE_SIZE
+        )(self._build_directory_tree)
+
+    @classmethod
+    def load(
+        cls,
+        dataset_filename,
+        source_path,
+        output_dir="output",
+        complexity_source="working_tree",
+        revision="HEAD",
+        complexity_metric="size",
+    ):
+        df = analyze_git_csv.read_git_log(
+            dataset_filename, analyze_git_csv.ANALYSIS_COLUMNS
+        )
+        file_complexities = analyze_git_csv.get_file_complexities(
+            source_path, complexity_source, revision, output_dir, complexity_metric
+        )
+        return cls(df, file_complexities)
+
+    def _query(self, endpoint, params):
+        """
+        Answers a query of an endpoint with params as a tuple of (name, value) pairs, e.g. from a query string, since lru_cache needs hashable arguments.
+        """
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"endpoint must be one of: {ENDPOINTS}")
+        params = dict(params)
+        since = parse_time(params.pop("since", None))
+        until = parse_time(params.pop("until", None))
+        return getattr(self, f"_{endpoint}")(since, until, **params)
+
+    def _window(self, since, until):
+        window, now = self._get_window(since, until)
+        return {
+            "rows": len(window),
+            "commits": int(window["commit_hash"].nunique()),
+            "authors": int(window["author"].nunique()),
+            "files": int(window["file"].nunique()),
+            "first": str(window["timestamp"].min()) if len(window) else None,
+            "last": str(window["timestamp"].max()) if len(window) else None,
+        }
+
+    def _hotspots(self, since, until, top="10"):
+        hotspots = self._get_hotspots(*self._get_window(since, until))
+        return [
+            hotspot._asdict()
+            for hotspot in analyze_git_csv.get_top_hotspots(hotspots, parse_top(top))
+        ]
+
+    def _histogram(
+        self,
+        since,
+        until,
+        column="author",
+        value="commit_hash",
+        aggregation="unique_count",
+        top="5",
+    ):
+        window, now = self._get_window(since, until)
+        histogram = Histogram(column, value, window)
+        histogram.set_aggregation(aggregation)
+        histogram.set_max_groupings(parse_top(top))
+        return histogram.to_json()
+
+    def _date_histogram(
+        self, since, until, value="commit_hash", aggregation="unique_count"
+    ):
+        window, now = self._get_window(since, until)
+        date_histogram = DateHistogram("month", value, window)
+        date_histogram.set_aggregation(aggregation)
+        return date_histogram.to_json()
+
+    def _bus_factor(self, since, until, level=None):
+        if level is not None and level not in analyze_git_csv.BUS_FACTOR_LEVELS:
+            raise ValueError(
+                f"level must be one of: {analyze_git_csv.BUS_FACTOR_LEVELS}"
+            )
+        window, now = self._get_window(since, until)
+        levels = analyze_git_csv.BUS_FACTOR_LEVELS if level is None else [level]
+        bus_factor = analyze_git_csv.calculate_bus_factor(
+            analyze_git_csv.get_recent_commits(window, now), levels
+        )
+        return bus_factor.to_dict(orient="records")
+
+    def _directories(self, since, until, path="", depth=None):
+        directory_tree = self._get_directory_tree(since, until)
+        return directory_tree.to_json(path, None if depth is None else int(depth))
+
+    def _get_window(self, since, until):
+        window = analyze_git_csv.get_time_window(self.df, since, until)
+        return window, self.now if until is None else until
+
+    def _get_hotspots(self, window, now):
+        file_stats = analyze_git_csv.calculate_file_stats(window, now)
+        return analyze_git_csv.determine_hotspot_data(
+            file_stats, self.file_complexities
+        )
+
+    def _build_directory_tree(self, since, until):
+        window, now = self._get_window(since, until)
+        hotspots = self._get_hotspots(window, now)
+        return DirectoryTree.from_frame(
+            window, {hotspot.file: hotspot.score for hotspot in hotspots}
+        )
+
+
+def parse_time(value):
+    if value is None:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def parse_top(value):
+    top = int(value)
+    if top < 1:
+        raise ValueError(f"top must be at least 1, not {top}")
+    return top
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /<endpoint>?<params> of the server's GitHistory as JSON, e.g. /histogram?column=two_dirs&since=2021-01-01.
+    """
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        endpoint = url.path.strip("/")
+        if endpoint not in ENDPOINTS:
+            self.send_json(404, {"error": f"endpoint must be one of: {ENDPOINTS}"})
+            return
+        params = tuple(sorted(urllib.parse.parse_qsl(url.query)))
+        try:
+            self.send_json(200, self.server.history.query(endpoint, params))
+        except (AssertionError, KeyError, TypeError, ValueError) as error:
+            self.send_json(400, {"error": str(error)})
+
+    def send_json(self, status, result):
+        body = json.dumps(result, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # dashboards poll often, the queries would flood the console
+        pass
+
+
+def create_server(history, port=DEFAULT_PORT):
+    """
+    Binds the server to localhost only, port 0 picks a free port.
+    """
+    server = HTTPServer((HOST, port), QueryRequestHandler)
+    server.history = history
+    return server
+
+
+def serve(history, port=DEFAULT_PORT):
+    server = create_server(history, port)
+    print(f"\n🔎 Serving queries on http://{HOST}:{server.server_port}/")
+    print(f"\tEndpoints: {', '.join(ENDPOINTS)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,7 +1,11 @@
 import os
+import subprocess
+import tempfile
 import unittest
-from unittest.mock import patch, Mock, MagicMock, PropertyMock
+from unittest.mock import ANY, patch, Mock, MagicMock, PropertyMock
 from analyze_git_csv import *
+import git_log_to_csv
+from test_unit_git_log import create_test_repo
 
 
 class UnitTests(unittest.TestCase):
@@ -17,6 +21,124 @@ class UnitTests(unittest.TestCase):
         # Assert
         self.assertEqual(results.shape, (15, 15))
 
+    def test_read_git_log_csv__given_columns__then_only_typed_columns_loaded(self):
+        # Arrange
+        input = "tests/data/git_log_analysis.csv"
+
+        # Act
+        results = read_git_log_csv(input, ["timestamp", "churn_count"])
+
+        # Assert
+        self.assertEqual(
+            list(results.columns),
+            ["timestamp", "author", "file", "churn_count", "file_abbr"],
+        )
+        self.assertEqual(results["author"].dtype, "category")
+        self.assertEqual(results["file_abbr"].dtype, "category")
+        self.assertEqual(results["timestamp"].dtype, "datetime64[ns]")
+        self.assertEqual(len(results), 15)
+
+    def test_read_git_log__given_npz_file__then_same_data_as_csv(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_filename = os.path.join(temp_dir, "git_log.csv")
+            npz_filename = os.path.join(temp_dir, "git_log.npz")
+            git_log_to_csv.create_csv("ops_aws_git_log.txt", "", "", csv_filename)
+            git_log_to_csv.create_csv("ops_aws_git_log.txt", "", "", npz_filename)
+            expected = read_git_log(csv_filename)
+
+            # Act
+            results = read_git_log(npz_filename)
+
+        # Assert
+        self.assertEqual(results.shape, expected.shape)
+        self.assertEqual(
+            calculate_file_commits(results), calculate_file_commits(expected)
+        )
+        self.assertEqual(
+            get_commit_age(results, datetime(2021, 2, 14)),
+            get_commit_age(expected, datetime(2021, 2, 14)),
+        )
+        self.assertEqual(results["epoch"].dtype, "int64")
+        self.assertEqual(results["author"].dtype, "category")
+
+    def test_map_categories__given_categorical_column__then_categorical_of_mapped_values_returned(
+        self,
+    ):
+        # Arrange
+        column = pd.Series(["b/x.py", "a/y.py", "b/x.py", "c/y.py"], dtype="category")
+
+        # Act
+        results = map_categories(column, lambda file: file.split("/")[1])
+
+        # Assert
+        self.assertEqual(list(results), ["x.py", "y.py", "x.py", "y.py"])
+        self.assertEqual(list(results.cat.categories), ["x.py", "y.py"])
+
+    def test_join_columns__given_categorical_columns__then_same_as_string_join(self):
+        # Arrange
+        df = pd.DataFrame(
+            {"dir_1": ["src", "", "src", "tests"], "dir_2": ["b", "", "a", "b"]}
+        )
+        categorical_df = df.astype("category")
+
+        # Act
+        results = join_columns(categorical_df, "dir_1", "dir_2")
+
+        # Assert
+        self.assertEqual(list(results), list(join_columns(df, "dir_1", "dir_2")))
+        self.assertEqual(list(results), ["src/b", "/", "src/a", "tests/b"])
+        self.assertEqual(
+            list(results.cat.categories), ["/", "src/a", "src/b", "tests/b"]
+        )
+
+    def test_get_time_window__given_newest_first_log__then_window_sliced(self):
+        # Arrange
+        df = pd.DataFrame(
+            {
+                "commit_hash": ["c4", "c3", "c3", "c2", "c1"],
+                "timestamp": pd.to_datetime(
+                    [
+                        "2021-03-01T10:00:00",
+                        "2021-02-01T10:00:00",
+                        "2021-02-01T10:00:00",
+                        "2021-01-15T10:00:00",
+                        "2021-01-01T10:00:00",
+                    ]
+                ),
+            }
+        )
+        sorted_df = sort_by_time(df)
+
+        # Act
+        results = get_time_window(
+            sorted_df, datetime(2021, 1, 15, 10), datetime(2021, 3, 1, 10)
+        )
+
+        # Assert
+        self.assertEqual(list(sorted_df["commit_hash"]), ["c1", "c2", "c3", "c3", "c4"])
+        self.assertEqual(list(results["commit_hash"]), ["c2", "c3", "c3"])
+        self.assertEqual(len(get_time_window(sorted_df, until=datetime(2021, 1, 1))), 0)
+        self.assertEqual(len(get_time_window(sorted_df)), 5)
+
+    def test_do_analysis__given_window_without_commits__then_no_charts_created(self):
+        # Arrange
+        input = "tests/data/git_log_analysis.csv"
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            do_analysis(
+                input,
+                "tests/data",
+                temp_dir,
+                since=datetime(2030, 1, 1),
+                until=datetime(2031, 1, 1),
+            )
+            results = os.listdir(temp_dir)
+
+        # Assert
+        self.assertEqual(results, [])
+
     def test_calculate_file_complexity__given_input_dir_of_files__files_scores_returned(
         self,
     ):
@@ -35,6 +157,34 @@ class UnitTests(unittest.TestCase):
             },
         )
 
+    def test_calculate_git_tree_complexity__given_bare_clone__then_same_as_working_tree(
+        self,
+    ):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = os.path.join(temp_dir, "repo")
+            bare_path = os.path.join(temp_dir, "repo.git")
+            create_test_repo(
+                repo_path,
+                [
+                    {"src/app.py": "print('a')\n", "README.md": "# a\n"},
+                    {"src/app.py": "print('bb')\n", ".github/ci.py": "x\n"},
+                ],
+            )
+            subprocess.run(
+                ["git", "clone", "-q", "--bare", repo_path, bare_path], check=True
+            )
+            expected = calculate_file_complexity(repo_path)
+
+            # Act
+            results = calculate_git_tree_complexity(bare_path)
+            first_commit_results = calculate_git_tree_complexity(bare_path, "HEAD~1")
+
+        # Assert
+        self.assertEqual(results, expected)
+        self.assertEqual(results, {"src/app.py": 12})
+        self.assertEqual(first_commit_results, {"src/app.py": 11})
+
     def test_calculate_file_commits__given_simple_test_data__then_correct_data_returned(
         self,
     ):
@@ -63,6 +213,124 @@ class UnitTests(unittest.TestCase):
             },
         )
 
+    def test_calculate_file_stats__given_simple_test_data__then_one_row_per_file(
+        self,
+    ):
+        # Arrange
+        input = "tests/data/git_log_analysis.csv"
+        df = read_git_log_csv(input)
+        set_date = datetime(2021, 2, 14)
+
+        # Act
+        results = calculate_file_stats(df, set_date)
+
+        # Assert
+        self.assertEqual(len(results), 11)
+        self.assertEqual(
+            results.loc["test_2.py"].to_dict(),
+            {
+                "commits": 3,
+                "authors": 1,
+                "churn": 5,
+                "first_epoch": pd.Timestamp("2021-02-11T23:11:45").value // 10**9,
+                "last_epoch": pd.Timestamp("2021-02-12T23:13:28").value // 10**9,
+                "age": 1,
+            },
+        )
+
+    def test_calculate_bus_factor__given_authors_in_dirs__then_files_and_dirs_rolled_up(
+        self,
+    ):
+        # Arrange
+        df = pd.DataFrame(
+            {
+                "commit_hash": ["c1", "c1", "c2", "c3", "c4"],
+                "author": ["Ann", "Ann", "Bob", "Ann", "Bob"],
+                "file": ["src/a.py", "src/api/b.py", "src/a.py", "src/a.py", "c.py"],
+            }
+        ).astype("category")
+
+        # Act
+        results = calculate_bus_factor(df)
+
+        # Assert
+        self.assertEqual(
+            results[["level", "path", "commits", "authors"]].values.tolist(),
+            [
+                ["file", "c.py", 1, 1],
+                ["file", "src/a.py", 3, 2],
+                ["file", "src/api/b.py", 1, 1],
+                ["dir_1", "src", 3, 2],
+                ["dir_2", "src/api", 1, 1],
+            ],
+        )
+        self.assertEqual(
+            results.loc[1, ["top_author", "top_author_share", "single_owner"]].tolist(),
+            ["Ann", 0.667, False],
+        )
+        self.assertEqual(
+            results["single_owner"].tolist(), [True, False, True, False, True]
+        )
+
+    def test_calculate_change_coupling__given_large_commit__then_pairs_of_small_commits_counted(
+        self,
+    ):
+        # Arrange
+        df = pd.DataFrame(
+            {
+                "commit_hash": ["c1", "c1", "c2", "c2", "c2", "c3", "c4", "c4", "c4"],
+                "file": ["a.py", "b.py", "b.py", "a.py", "c.py", "a.py"]
+                + ["a.py", "b.py", "c.py"],
+            }
+        ).astype("category")
+
+        # Act
+        results = calculate_change_coupling(
+            df, max_commit_files=2, min_shared_commits=1
+        )
+        all_results = calculate_change_coupling(
+            df, max_commit_files=3, min_shared_commits=2
+        )
+
+        # Assert
+        self.assertEqual(results.values.tolist(), [["a.py", "b.py", 1, 2, 1, 0.667]])
+        self.assertEqual(
+            all_results.values.tolist(),
+            [
+                ["a.py", "b.py", 3, 4, 3, 0.857],
+                ["b.py", "c.py", 2, 3, 2, 0.8],
+                ["a.py", "c.py", 2, 4, 2, 0.667],
+            ],
+        )
+
+    def test_calculate_bus_factor_over_time__given_window__then_old_authors_expire(
+        self,
+    ):
+        # Arrange
+        df = pd.DataFrame(
+            {
+                "commit_hash": pd.Categorical(["c1", "c2", "c3"]),
+                "author": pd.Categorical(["Ann", "Bob", "Bob"]),
+                "file": pd.Categorical(["src/a.py", "src/a.py", "src/a.py"]),
+                "timestamp": pd.to_datetime(["2021-01-05", "2021-02-10", "2021-04-20"]),
+            }
+        )
+
+        # Act
+        results = calculate_bus_factor_over_time(df, window_months=2)
+
+        # Assert
+        file_results = results[results["level"] == "file"]
+        self.assertEqual(
+            file_results["month"].astype(str).tolist(),
+            ["2021-01", "2021-02", "2021-03", "2021-04"],
+        )
+        self.assertEqual(file_results["authors"].tolist(), [1, 2, 1, 1])
+        self.assertEqual(file_results["commits"].tolist(), [1, 2, 1, 1])
+        self.assertEqual(
+            results[results["level"] == "dir_1"]["authors"].tolist(), [1, 2, 1, 1]
+        )
+
     def test_get_commit_age__given_simple_test_data__then_correct_data_returned(
         self,
     ):
@@ -117,6 +385,66 @@ class UnitTests(unittest.TestCase):
         ]
         self.assertEqual(results, expected)
 
+    def test_calculate_hotspot_scores__given_score_funcs__then_scores_normalized(
+        self,
+    ):
+        # Arrange
+        file_stats = pd.DataFrame(
+            {"commits": [3, 1, 4, 10], "age": [0, 0, 199, 9]},
+            index=["a.py", "b.py", "c.py", "d.py"],
+        )
+        file_complexities = {"a.py": 10, "b.py": 10, "c.py": 20}
+
+        # Act
+        results = calculate_hotspot_scores(file_stats, file_complexities)
+        vectorized_results = calculate_hotspot_scores(
+            file_stats, file_complexities, lambda cm, cp, a: cm * cp / a
+        )
+        scalar_results = calculate_hotspot_scores(
+            file_stats,
+            file_complexities,
+            lambda cm, cp, a: cm if a < 100 else math.log(cp, 2),
+        )
+
+        # Assert
+        self.assertEqual(list(results["file"]), ["a.py", "c.py"])
+        self.assertEqual(list(results["age"]), [1, 200])
+        self.assertEqual(list(results["score"]), [100.0, 2.8])
+        self.assertEqual(list(vectorized_results["score"]), [100.0, 1.3])
+        self.assertEqual(list(scalar_results["score"]), [69.4, 100.0])
+
+    def test_calculate_hotspot_scores__given_all_scores_zero__then_zero_scores(
+        self,
+    ):
+        # Arrange
+        file_stats = pd.DataFrame(
+            {"commits": [3, 4], "age": [0, 9]}, index=["a.py", "b.py"]
+        )
+        file_complexities = {"a.py": 10, "b.py": 20}
+
+        # Act
+        results = calculate_hotspot_scores(
+            file_stats, file_complexities, lambda cm, cp, a: cm * 0
+        )
+
+        # Assert
+        self.assertEqual(list(results["file"]), ["a.py", "b.py"])
+        self.assertEqual(list(results["score"]), [0.0, 0.0])
+
+    def test_render_charts__given_empty_chart_error__then_only_optional_chart_skipped(
+        self,
+    ):
+        # Arrange
+        plot_func = Mock(side_effect=TypeError(EMPTY_CHART_ERROR))
+
+        # Act
+        render_charts([(plot_func, ("a.png",), True)], workers=1)
+
+        # Assert
+        plot_func.assert_called_once_with("a.png", renderer=ANY)
+        with self.assertRaises(TypeError):
+            render_charts([(plot_func, ("b.png",))], workers=1)
+
     def test_get_top_hotspots__given_short_list__then_top_3_returned(self):
         # Arrange
         input = [
@@ -0,0 +1,108 @@
+import json
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+from batch_analysis import *
+from test_unit_git_log import create_test_repo
+
+
+class UnitTests(unittest.TestCase):
+    def test_find_repos__given_glob__then_only_git_repos_returned(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            create_test_repo(os.path.join(temp_dir, "repo_b"), [{"a.py": "a\n"}])
+            create_test_repo(os.path.join(temp_dir, "repo_a"), [{"a.py": "a\n"}])
+            os.makedirs(os.path.join(temp_dir, "not_a_repo"))
+            subprocess.run(
+                [
+                    "git",
+                    "clone",
+                    "-q",
+                    "--mirror",
+                    os.path.join(temp_dir, "repo_a"),
+                    os.path.join(temp_dir, "repo_c.git"),
+                ],
+                check=True,
+            )
+
+            # Act
+            results = find_repos([os.path.join(temp_dir, "*")])
+
+        # Assert
+        self.assertEqual(
+            [os.path.basename(path) for path in results],
+            ["repo_a", "repo_b", "repo_c.git"],
+        )
+
+    def test_get_repo_output_dirs__given_same_repo_names__then_dirs_numbered(self):
+        # Arrange
+        repo_paths = ["../team_a/api", "../team_b/api", "../web"]
+
+        # Act
+        results = get_repo_output_dirs(repo_paths, "output/batch")
+
+        # Assert
+        self.assertEqual(
+            results,
+            [
+                os.path.join("output/batch", "api"),
+                os.path.join("output/batch", "api_2"),
+                os.path.join("output/batch", "web"),
+            ],
+        )
+
+    def test_run_batch__given_repos_and_missing_repo__then_summary_has_each_repo(
+        self,
+    ):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_paths = []
+            for name in ["repo_1", "repo_2"]:
+                repo_path = os.path.join(temp_dir, name)
+                create_test_repo(
+                    repo_path,
+                    [
+                        {"src/app.py": "print('a')\n", "README.md": "# a\n"},
+                        {"src/app.py": "print('b')\n"},
+                        {"src/app.py": "print('c')\n"},
+                    ],
+                )
+                repo_paths.append(repo_path)
+            mirror_path = os.path.join(temp_dir, "repo_3.git")
+            subprocess.run(
+                ["git", "clone", "-q", "--mirror", repo_paths[0], mirror_path],
+                check=True,
+            )
+            repo_paths.append(mirror_path)
+            repo_paths.append(os.path.join(temp_dir, "missing_repo"))
+            output_root = os.path.join(temp_dir, "output")
+
+            # Act
+            results = run_batch(repo_paths, output_root, workers=2)
+            with open(os.path.join(output_root, "summary.json")) as summary_file:
+                summary = json.load(summary_file)
+            html_files = [
+                os.path.exists(os.path.join(result["output_dir"], "results.html"))
+                for result in results["repos"]
+            ]
+            with open(
+                os.path.join(results["repos"][3]["output_dir"], "log.txt")
+            ) as log_file:
+                missing_repo_log = log_file.read()
+
+        # Assert
+        self.assertEqual(
+            [result["status"] for result in summary["repos"]],
+            ["ok", "ok", "ok", "failed"],
+        )
+        self.assertEqual(html_files, [True, True, True, False])
+        self.assertEqual(summary["failed"], 1)
+        self.assertIn("analysis", summary["repos"][0]["timings"])
+        self.assertIn("fatal: cannot change to", summary["repos"][3]["error"])
+        self.assertIn("fatal: cannot change to", missing_repo_log)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+
+import pandas as pd
+
+from ChartCube import *
+
+
+def create_commit_rows():
+    return pd.DataFrame(
+        {
+            "commit_hash": pd.Categorical(["c1", "c1", "c1", "c2", "c3"]),
+            "datetime": pd.to_datetime(
+                ["2021-01-05", "2021-01-05", "2021-01-05", "2021-02-01", "2021-02-03"]
+            ),
+            "author": pd.Categorical(["Ann", "Ann", "Ann", "Bob", "Ann"]),
+            "two_dirs": pd.Categorical(
+                ["src/api", "src/api", "web/", "src/api", "web/"]
+            ),
+            "file": pd.Categorical(
+                ["src/api/a.py", "src/api/b.py", "web/c.js", "src/api/a.py", "web/c.js"]
+            ),
+            "file_abbr": pd.Categorical(
+                ["src/api/a.py", "src/api/b.py", "web/c.js", "src/api/a.py", "web/c.js"]
+            ),
+            "churn_count": [1, 2, 3, 4, 5],
+        }
+    )
+
+
+class UnitTests(unittest.TestCase):
+    def test_aggregate__given_cube__then_same_as_grouping_rows(self):
+        # Arrange
+        df = create_commit_rows()
+        df["month"] = df["datetime"].dt.to_period("M")
+        cube = ChartCube.from_frame(df)
+        groupings = [
+            (["author"], "commit_hash", "unique_count"),
+            (["two_dirs"], "commit_hash", "unique_count"),
+            (["month", "two_dirs"], "commit_hash", "unique_count"),
+            (["month"], "author", "unique_count"),
+            (["file_abbr"], "commit_hash", "count"),
+            (["author"], "churn_count", "sum"),
+            (["month", "author"], "churn_count", "avg"),
+        ]
+
+        # Act
+        results = [aggregate(cube, *grouping) for grouping in groupings]
+
+        # Assert
+        for grouping, result in zip(groupings, results):
+            expected = aggregate(df, *grouping)
+            pd.testing.assert_series_equal(result, expected, obj=str(grouping))
+
+    def test_aggregate__given_avg__then_mean_churn_per_row(self):
+        # Arrange
+        df = create_commit_rows()
+        cube = ChartCube.from_frame(df)
+
+        # Act
+        results = aggregate(cube, ["author"], "churn_count", "avg")
+
+        # Assert
+        self.assertEqual(results.to_dict(), {"Ann": 2.75, "Bob": 4.0})
+        with self.assertRaises(ValueError):
+            aggregate(cube, ["author"], "commit_hash", "avg")
+        with self.assertRaises(ValueError):
+            aggregate(df, ["author"], "churn_count", "median")
+
+    def test_isin__given_files__then_commits_per_author_not_counted(self):
+        # Arrange
+        cube = ChartCube.from_frame(create_commit_rows())
+
+        # Act
+        results = cube.isin("file", ["src/api/a.py", "src/api/b.py"])
+
+        # Assert
+        self.assertEqual(
+            results.aggregate(["file_abbr"], "author", "unique_count").to_dict(),
+            {"src/api/a.py": 2, "src/api/b.py": 1},
+        )
+        with self.assertRaises(ValueError):
+            results.aggregate(["author"], "commit_hash", "unique_count")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from ChartRenderer import *
+from Histogram import Histogram
+
+
+class UnitTests(unittest.TestCase):
+    def test_figure__given_many_charts__then_no_figures_left_open(self):
+        # Arrange
+        df = pd.DataFrame({"author": ["Ann", "Bob", "Ann"], "churn_count": [1, 2, 3]})
+        histogram = Histogram("author", "churn_count", df)
+        open_figures = len(plt.get_fignums())
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with ChartRenderer(style="default") as renderer:
+                for count in range(25):
+                    histogram.save_plot(
+                        os.path.join(temp_dir, f"chart_{count}.png"), renderer
+                    )
+            files = os.listdir(temp_dir)
+
+        # Assert
+        self.assertEqual(len(files), 25)
+        self.assertEqual(renderer.chart_count, 25)
+        self.assertEqual(len(plt.get_fignums()), open_figures)
+
+    def test_get_available_style__given_chart_style__then_installed_style_returned(
+        self,
+    ):
+        # Arrange
+        style = CHART_STYLE
+
+        # Act
+        results = get_available_style(style)
+
+        # Assert
+        self.assertIn(results, plt.style.available)
+        self.assertEqual(get_available_style("default"), "default")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+from ComplexityEngine import *
+from test_unit_git_log import create_test_repo
+
+
+SAMPLE_CODE = b"""# comment
+import os
+
+
+def main():
+    if True:
+        print("a")
+\tprint("b")
+  return
+"""
+
+
+class UnitTests(unittest.TestCase):
+    def test_count_logical_lines__given_code__then_blank_and_comment_lines_skipped(
+        self,
+    ):
+        # Arrange
+        input = SAMPLE_CODE
+
+        # Act
+        results = count_logical_lines(input)
+
+        # Assert
+        self.assertEqual(results, 6)
+
+    def test_calculate_whitespace_complexity__given_code__then_indents_summed(self):
+        # Arrange
+        input = SAMPLE_CODE
+
+        # Act
+        results = calculate_whitespace_complexity(input)
+
+        # Assert
+        self.assertEqual(results, 1 + 2 + 1 + 0)
+
+    def test_hash_blob__given_content__then_same_as_git_hash_object(self):
+        # Arrange
+        input = b"hello\n"
+
+        # Act
+        results = hash_blob(input)
+
+        # Assert
+        self.assertEqual(results, "ce013625030ba8dba906f756967f9e9ca394464a")
+
+    def test_score_git_blobs__given_cached_blobs__then_only_new_blobs_scored(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = os.path.join(temp_dir, "repo")
+            cache_filename = os.path.join(temp_dir, "complexity_cache.json")
+            create_test_repo(
+                repo_path,
+                [{"a.py": "a = 1\n", "b.py": "def b():\n    return 2\n"}],
+            )
+            blob_hashes = {
+                file: compute_blob_hash(os.path.join(repo_path, file))
+                for file in ["a.py", "b.py"]
+            }
+            ComplexityEngine("lines", 2, cache_filename).score_git_blobs(
+                repo_path, {"a.py": blob_hashes["a.py"]}
+            )
+            engine = ComplexityEngine("lines", 2, cache_filename)
+
+            # Act
+            results = engine.score_git_blobs(repo_path, blob_hashes)
+            file_results = engine.score_files(repo_path, blob_hashes)
+
+        # Assert
+        self.assertEqual(results, {"a.py": 1, "b.py": 2})
+        self.assertEqual(file_results, results)
+        self.assertEqual(engine.cached_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
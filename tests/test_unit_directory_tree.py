@@ -0,0 +1,90 @@
+import unittest
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+
+import pandas as pd
+
+from DirectoryTree import *
+
+
+def create_commit_rows():
+    return pd.DataFrame(
+        {
+            "commit_hash": pd.Categorical(["c1", "c1", "c2", "c3", "c3"]),
+            "author": pd.Categorical(["Ann", "Ann", "Bob", "Ann", "Ann"]),
+            "file": pd.Categorical(
+                ["src/api/a.py", "src/api/v1/b.py", "src/api/a.py", "c.py", "src/d.py"]
+            ),
+            "churn_count": [1, 2, 3, 4, 5],
+        }
+    )
+
+
+class UnitTests(unittest.TestCase):
+    def test_from_frame__given_nested_dirs__then_every_level_rolled_up(self):
+        # Arrange
+        df = create_commit_rows()
+
+        # Act
+        results = DirectoryTree.from_frame(df, {"src/api/a.py": 80.0, "c.py": 20.0})
+
+        # Assert
+        self.assertEqual(
+            results.nodes[
+                ["path", "depth", "files", "commits", "churn", "authors", "score"]
+            ].values.tolist(),
+            [
+                ["", 0, 4, 3, 15, 2, 100.0],
+                ["c.py", 1, 1, 1, 4, 1, 20.0],
+                ["src", 1, 3, 3, 11, 2, 80.0],
+                ["src/api", 2, 2, 2, 6, 2, 80.0],
+                ["src/api/a.py", 3, 1, 2, 4, 2, 80.0],
+                ["src/api/v1", 3, 1, 1, 2, 1, 0.0],
+                ["src/api/v1/b.py", 4, 1, 1, 2, 1, 0.0],
+                ["src/d.py", 2, 1, 1, 5, 1, 0.0],
+            ],
+        )
+        self.assertEqual(list(results.level(2)["path"]), ["src/api"])
+
+    def test_subtree__given_dir_and_depth__then_only_nodes_below_dir_returned(self):
+        # Arrange
+        tree = DirectoryTree.from_frame(create_commit_rows())
+
+        # Act
+        results = tree.subtree("src/api/", depth=1)
+
+        # Assert
+        self.assertEqual(
+            list(results["path"]), ["src/api", "src/api/a.py", "src/api/v1"]
+        )
+        self.assertEqual(len(tree.subtree("src/api/v1/b.py")), 1)
+        self.assertRaises(ValueError, tree.subtree, "web")
+
+    def test_to_json__given_subtree__then_nested_children_returned(self):
+        # Arrange
+        tree = DirectoryTree.from_frame(create_commit_rows())
+
+        # Act
+        results = tree.to_json("src/api")
+
+        # Assert
+        self.assertEqual(results["path"], "src/api")
+        self.assertEqual(
+            [child["name"] for child in results["children"]], ["a.py", "v1"]
+        )
+        self.assertNotIn("children", results["children"][0])
+        self.assertEqual(
+            results["children"][1]["children"][0],
+            {
+                "path": "src/api/v1/b.py",
+                "name": "b.py",
+                "files": 1,
+                "commits": 1,
+                "churn": 2,
+                "authors": 1,
+                "score": 0.0,
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
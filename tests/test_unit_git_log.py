@@ -1,6 +1,26 @@
+import io
+import json
+import os
+import subprocess
+import tempfile
 import unittest
 from unittest.mock import patch, Mock, MagicMock, PropertyMock
 from git_log_to_csv import *
+import git_log_bytes_parser
+from PathClassifier import PathClassifier
+
+
+def create_test_repo(repo_path, commits):
+    git = ["git", "-C", repo_path, "-c", "user.name=Test Author"]
+    git = git + ["-c", "user.email=test@example.com"]
+    subprocess.run(["git", "init", "-q", repo_path], check=True)
+    for number, files in enumerate(commits):
+        for file, text in files.items():
+            os.makedirs(os.path.dirname(os.path.join(repo_path, file)), exist_ok=True)
+            with open(os.path.join(repo_path, file), "w") as source_file:
+                source_file.write(text)
+        subprocess.run(git + ["add", "-A"], check=True)
+        subprocess.run(git + ["commit", "-q", "-m", f"commit {number}"], check=True)
 
 
 class UnitTests(unittest.TestCase):
@@ -183,6 +203,438 @@ c8ed1ef,1576592170,2019-12-17T09:16:10,2019-12-17,2019,12,17,"Steve Ziegler","RE
         for count, line in enumerate(results.split("\n")):
             self.assertEqual(line, expected_splits[count], f"line {count} is different")
 
+    def test_read_commit_blocks__given_small_chunks__then_same_as_split(self):
+        # Arrange
+        input = open("ops_aws_git_log.txt", "r").read()
+
+        # Act
+        results = list(read_commit_blocks(io.StringIO(input), chunk_size=7))
+
+        # Assert
+        self.assertEqual(results, input.split("^^"))
+
+    def test_read_commit_blocks__given_separator_across_chunks__then_same_as_split(
+        self,
+    ):
+        # Arrange
+        input = "^^a^^bc^^^d^^^^e^f^^"
+
+        # Act
+        results = [
+            list(read_commit_blocks(io.StringIO(input), chunk_size=chunk_size))
+            for chunk_size in range(1, len(input) + 1)
+        ]
+
+        # Assert
+        for result in results:
+            self.assertEqual(result, input.split("^^"))
+
+    def test_create_csv__given_log_file__then_csv_matches_process_git_log(self):
+        # Arrange
+        input = "ops_aws_git_log.txt"
+        expected = process_git_log(open(input, "r").read(), "\\.lock", "github")
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            create_csv(input, "\\.lock", "github", output_filename)
+            results = open(output_filename, "r").read()
+
+        # Assert
+        self.assertEqual(results, expected)
+
+    def test_create_csv_from_repo__given_git_repo__then_csv_matches_git_log_text(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = os.path.join(temp_dir, "repo")
+            create_test_repo(
+                repo_path,
+                [
+                    {"README.md": "hello\n", "src/app/main.py": "print(1)\n"},
+                    {"src/app/main.py": "print(2)\nprint(3)\n"},
+                ],
+            )
+            git_log_text = subprocess.run(
+                get_git_log_command(repo_path),
+                input=get_git_log_revisions(get_ref_tips(repo_path), []),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+
+            # Act
+            create_csv_from_repo(repo_path, "", "", output_filename)
+            results = open(output_filename, "r").read()
+
+        # Assert
+        self.assertEqual(results, process_git_log(git_log_text))
+        self.assertEqual(len(results.splitlines()), 4)
+        self.assertIn('"Test Author","src/app/main.py",3,src,app,,', results)
+
+    def test_create_csv__given_incremental_log__then_only_new_commits_appended(self):
+        # Arrange
+        first_log = """^^c8ed1ef--1576592170--2019-12-17T09:16:10-05:00--Steve Ziegler
+
+
+3	5	README.md
+"""
+        second_log = (
+            first_log
+            + """^^a999999--1576592605--2019-12-17T09:23:25-05:00--Steve Ziegler
+
+
+2	1	sam-app/add_cw_log_error_metric/CloudFormationReplicator.py
+"""
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_filename = os.path.join(temp_dir, "git_log.txt")
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            with open(log_filename, "w") as log_file:
+                log_file.write(first_log)
+            create_csv(log_filename, "", "", output_filename, incremental=True)
+            with open(log_filename, "w") as log_file:
+                log_file.write(second_log)
+
+            # Act
+            create_csv(log_filename, "", "", output_filename, incremental=True)
+            results = open(output_filename, "r").read()
+            checkpoint = CommitCheckpoint.load(get_checkpoint_filename(output_filename))
+
+        # Assert
+        self.assertEqual(results, process_git_log(second_log))
+        self.assertEqual(checkpoint.commit_hash, "a999999")
+        self.assertEqual(checkpoint.epoch, 1576592605)
+
+    def test_create_csv__given_incremental_log_with_older_commit__then_older_commit_appended(
+        self,
+    ):
+        # Arrange
+        first_log = """^^a999999--1576592605--2019-12-17T09:23:25-05:00--Steve Ziegler
+
+
+2	1	sam-app/app.py
+"""
+        older_commit = """^^c8ed1ef--1576592170--2019-12-17T09:16:10-05:00--Steve Ziegler
+
+
+3	5	README.md
+"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_filename = os.path.join(temp_dir, "git_log.txt")
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            with open(log_filename, "w") as log_file:
+                log_file.write(first_log)
+            create_csv(log_filename, "", "", output_filename, incremental=True)
+            with open(log_filename, "w") as log_file:
+                log_file.write(older_commit + first_log)
+
+            # Act
+            create_csv(log_filename, "", "", output_filename, incremental=True)
+            results = open(output_filename, "r").read()
+
+        # Assert
+        self.assertEqual(results, process_git_log(first_log + older_commit))
+
+    def test_create_csv_from_repo__given_incremental_run__then_same_as_full_run(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = os.path.join(temp_dir, "repo")
+            create_test_repo(repo_path, [{"README.md": "hello\n"}])
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            create_csv_from_repo(repo_path, "", "", output_filename, incremental=True)
+            create_test_repo(repo_path, [{"src/main.py": "print(1)\n"}])
+
+            # Act
+            create_csv_from_repo(repo_path, "", "", output_filename, incremental=True)
+            results = open(output_filename, "r").read()
+            full_output_filename = os.path.join(temp_dir, "full_git_log.csv")
+            create_csv_from_repo(repo_path, "", "", full_output_filename)
+            expected = open(full_output_filename, "r").read()
+
+        # Assert
+        self.assertEqual(results, expected)
+        self.assertEqual(len(results.splitlines()), 3)
+
+    def test_create_csv_from_repo__given_incremental_run__then_checkpoint_has_only_tips(
+        self,
+    ):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = os.path.join(temp_dir, "repo")
+            create_test_repo(repo_path, [{"README.md": "hello\n"}])
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            head = subprocess.run(
+                ["git", "-C", repo_path, "rev-parse", "HEAD"],
+                capture_output=True,
+                check=True,
+                encoding="utf-8",
+            ).stdout.strip()
+
+            # Act
+            create_csv_from_repo(repo_path, "", "", output_filename, incremental=True)
+            with open(get_checkpoint_filename(output_filename)) as checkpoint_file:
+                results = json.load(checkpoint_file)
+            rows = open(output_filename, "r").read().splitlines()
+
+        # Assert
+        self.assertEqual(results["tips"], [head])
+        self.assertEqual(results["commit_hash"], head)
+        self.assertNotIn("commit_hashes", results)
+        self.assertTrue(rows[1].startswith(f"{head},"))
+
+    def test_create_csv_from_repo__given_merged_backdated_branch__then_incremental_same_as_full(
+        self,
+    ):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = os.path.join(temp_dir, "repo")
+            git = ["git", "-C", repo_path, "-c", "user.name=Test Author"]
+            git = git + ["-c", "user.email=test@example.com"]
+
+            def commit(file, date):
+                with open(os.path.join(repo_path, file), "w") as source_file:
+                    source_file.write(date)
+                dates = {"GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date}
+                subprocess.run(git + ["add", "-A"], check=True)
+                subprocess.run(
+                    git + ["commit", "-q", "-m", file],
+                    check=True,
+                    env=dict(os.environ, **dates),
+                )
+
+            subprocess.run(["git", "init", "-q", "-b", "main", repo_path], check=True)
+            commit("a.py", "2024-01-01T10:00:00")
+            commit("b.py", "2024-01-10T10:00:00")
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            create_csv_from_repo(repo_path, "", "", output_filename, incremental=True)
+            # a branch dated before the checkpoint, e.g. pushed after the nightly run
+            subprocess.run(
+                git + ["checkout", "-q", "-b", "branch", "HEAD~1"], check=True
+            )
+            commit("f.py", "2024-01-05T10:00:00")
+            subprocess.run(git + ["checkout", "-q", "main"], check=True)
+            subprocess.run(
+                git + ["merge", "-q", "--no-ff", "-m", "merge", "branch"],
+                check=True,
+                env=dict(os.environ, GIT_COMMITTER_DATE="2024-01-11T10:00:00"),
+            )
+            subprocess.run(git + ["branch", "-q", "-D", "branch"], check=True)
+
+            # Act
+            create_csv_from_repo(repo_path, "", "", output_filename, incremental=True)
+            results = open(output_filename, "r").read()
+            full_output_filename = os.path.join(temp_dir, "full_git_log.csv")
+            create_csv_from_repo(repo_path, "", "", full_output_filename)
+            expected = open(full_output_filename, "r").read()
+
+        # Assert
+        self.assertEqual(sorted(results.splitlines()), sorted(expected.splitlines()))
+        self.assertEqual(len(results.splitlines()), 4)
+        self.assertIn('"f.py"', results)
+
+    def test_create_csv_from_repo__given_npz_run_between_incremental_runs__then_csv_same_as_full_run(
+        self,
+    ):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            repo_path = os.path.join(temp_dir, "repo")
+            create_test_repo(repo_path, [{"a.py": "a\n"}, {"b.py": "b\n"}])
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            npz_filename = os.path.join(temp_dir, "git_log.npz")
+            create_csv_from_repo(repo_path, "", "", output_filename, incremental=True)
+            create_test_repo(repo_path, [{"c.py": "c\n"}])
+            create_csv_from_repo(repo_path, "", "", npz_filename)
+            create_test_repo(repo_path, [{"d.py": "d\n"}])
+
+            # Act
+            create_csv_from_repo(repo_path, "", "", output_filename, incremental=True)
+            results = open(output_filename, "r").read()
+            full_output_filename = os.path.join(temp_dir, "full_git_log.csv")
+            create_csv_from_repo(repo_path, "", "", full_output_filename)
+            expected = open(full_output_filename, "r").read()
+            checkpoint_files = sorted(
+                file for file in os.listdir(temp_dir) if file.endswith(".json")
+            )
+
+        # Assert
+        self.assertEqual(results, expected)
+        self.assertEqual(len(results.splitlines()), 5)
+        self.assertEqual(checkpoint_files, ["git_log.csv.checkpoint.json"])
+
+    def test_find_commit_chunk_offsets__given_log_file__then_chunks_start_at_commits(
+        self,
+    ):
+        # Arrange
+        input = "ops_aws_git_log.txt"
+        log = open(input, "rb").read()
+
+        # Act
+        results = find_commit_chunk_offsets(input, 4)
+
+        # Assert
+        self.assertEqual(results[0][0], 0)
+        self.assertEqual(results[-1][1], len(log))
+        for start, end in results[1:]:
+            self.assertEqual(log[start - 1 : start + 2], b"\n^^")
+
+    def test_create_csv__given_workers__then_csv_matches_serial_parse(self):
+        # Arrange
+        input = "ops_aws_git_log.txt"
+        expected = process_git_log(open(input, "r").read(), "\\.lock", "github")
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            create_csv(
+                input, "\\.lock", "github", output_filename, workers=3, incremental=True
+            )
+            results = open(output_filename, "r").read()
+            checkpoint = CommitCheckpoint.load(get_checkpoint_filename(output_filename))
+
+        # Assert
+        self.assertEqual(results, expected)
+        self.assertEqual(checkpoint.commit_hash, "71cb6e4")
+
+    def test_create_csv__given_npz_output__then_export_matches_csv(self):
+        # Arrange
+        input = "ops_aws_git_log.txt"
+        expected = process_git_log(open(input, "r").read(), "\\.lock", "github")
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            npz_filename = os.path.join(temp_dir, "git_log.npz")
+            csv_filename = os.path.join(temp_dir, "git_log.csv")
+            create_csv(input, "\\.lock", "github", npz_filename, workers=2)
+            export_csv(npz_filename, csv_filename)
+            results = open(csv_filename, "r").read()
+
+        # Assert
+        self.assertEqual(results, expected)
+
+    def test_create_csv__given_mmap_parser__then_csv_matches_text_parser(self):
+        # Arrange
+        input = "ops_aws_git_log.txt"
+        expected = process_git_log(open(input, "r").read(), "\\.lock", "github")
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_filename = os.path.join(temp_dir, "git_log.csv")
+            create_csv(
+                input,
+                "\\.lock",
+                "github",
+                output_filename,
+                parser="mmap",
+                incremental=True,
+            )
+            results = open(output_filename, "r").read()
+            checkpoint = CommitCheckpoint.load(get_checkpoint_filename(output_filename))
+
+        # Assert
+        self.assertEqual(results, expected)
+        self.assertEqual(checkpoint.commit_hash, "71cb6e4")
+
+    def test_create_csv__given_mmap_parser_and_workers_npz__then_export_matches_csv(
+        self,
+    ):
+        # Arrange
+        input = "ops_aws_git_log.txt"
+        expected = process_git_log(open(input, "r").read(), "\\.lock", "github")
+
+        # Act
+        with tempfile.TemporaryDirectory() as temp_dir:
+            npz_filename = os.path.join(temp_dir, "git_log.npz")
+            csv_filename = os.path.join(temp_dir, "git_log.csv")
+            create_csv(
+                input, "\\.lock", "github", npz_filename, workers=2, parser="mmap"
+            )
+            export_csv(npz_filename, csv_filename)
+            results = open(csv_filename, "r").read()
+
+        # Assert
+        self.assertEqual(results, expected)
+
+    def test_classify_file__given_nested_file__then_first_four_dirs_returned(self):
+        # Arrange
+        classifier = PathClassifier("\\.lock", "github")
+
+        # Act
+        results = [
+            classifier.classify_file("README.md"),
+            classifier.classify_file("sam-app/a/b/c/d/app.py"),
+            classifier.classify_file("sam-app/Gemfile.lock"),
+            classifier.include_author("github-actions"),
+            classifier.include_author("Steve Ziegler"),
+        ]
+
+        # Assert
+        self.assertEqual(
+            results,
+            [("", "", "", ""), ("sam-app", "a", "b", "c"), None, False, True],
+        )
+
+    def test_classify_file__given_repeated_files__then_cache_hits_counted(self):
+        # Arrange
+        classifier = PathClassifier("\\.lock", "", cache_size=2)
+
+        # Act
+        for file in ["a/x.py", "a/x.py", "b/y.py", "c/z.py", "a/x.py"]:
+            classifier.classify_file(file)
+        results = classifier.cache_info()["files"]
+
+        # Assert
+        self.assertEqual(results.hits, 1)
+        self.assertEqual(results.misses, 4)
+        self.assertEqual(results.currsize, 2)
+
+    def test_read_log_slices__given_small_slice_size__then_slices_split_on_commits(
+        self,
+    ):
+        # Arrange
+        input = "ops_aws_git_log.txt"
+        log = open(input, "rb").read()
+
+        # Act
+        results = list(git_log_bytes_parser.read_log_slices(input, slice_size=1000))
+
+        # Assert
+        self.assertEqual(b"".join(results), log)
+        for log_slice in results[1:]:
+            self.assertTrue(log_slice.startswith(b"^^"))
+
+    def test_create_csv__given_incremental_npz__then_same_as_full_run(self):
+        # Arrange
+        first_log = """^^c8ed1ef--1576592170--2019-12-17T09:16:10-05:00--Steve Ziegler
+
+
+3	5	README.md
+"""
+        second_log = (
+            first_log + """^^a999999--1576592605--2019-12-17T09:23:25-05:00--Les Green
+
+
+2	1	sam-app/add_cw_log_error_metric/CloudFormationReplicator.py
+"""
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_filename = os.path.join(temp_dir, "git_log.txt")
+            npz_filename = os.path.join(temp_dir, "git_log.npz")
+            csv_filename = os.path.join(temp_dir, "git_log.csv")
+            with open(log_filename, "w") as log_file:
+                log_file.write(first_log)
+            create_csv(log_filename, "", "", npz_filename, incremental=True)
+            with open(log_filename, "w") as log_file:
+                log_file.write(second_log)
+
+            # Act
+            create_csv(log_filename, "", "", npz_filename, incremental=True)
+            export_csv(npz_filename, csv_filename)
+            results = open(csv_filename, "r").read()
+
+        # Assert
+        self.assertEqual(results, process_git_log(second_log))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,100 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from datetime import datetime
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+
+from query_server import *
+
+
+def create_history():
+    df = analyze_git_csv.read_git_log_csv("tests/data/git_log_analysis.csv")
+    return GitHistory(df, {"test_1.py": 22, "test_2.py": 67}, datetime(2021, 2, 14))
+
+
+def get_json(server, path):
+    url = f"http://{HOST}:{server.server_port}{path}"
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+class UnitTests(unittest.TestCase):
+    def test_query__given_same_query_twice__then_second_answer_cached(self):
+        # Arrange
+        history = create_history()
+        params = (("column", "author"), ("since", "2021-02-01"))
+
+        # Act
+        results = history.query("histogram", params)
+        cached_results = history.query("histogram", params)
+
+        # Assert
+        self.assertIs(cached_results, results)
+        self.assertEqual(history.query.cache_info().hits, 1)
+        self.assertEqual(
+            history.query("hotspots", ()),
+            [
+                history.query("hotspots", (("top", "1"),))[0],
+                {
+                    "file": "test_1.py",
+                    "commits": 3,
+                    "complexity": 22,
+                    "age": 3,
+                    "score": 32.8,
+                },
+            ],
+        )
+
+    def test_query__given_time_window__then_only_rows_in_window_used(self):
+        # Arrange
+        history = create_history()
+
+        # Act
+        results = history.query(
+            "window", (("since", "2021-02-11"), ("until", "2021-02-12"))
+        )
+
+        # Assert
+        self.assertEqual(results["rows"], 14)
+        self.assertEqual(results["first"], "2021-02-11 23:11:45")
+        self.assertEqual(results["last"], "2021-02-11 23:13:02")
+        self.assertEqual(history.query("window", ())["rows"], 15)
+
+    def test_create_server__given_local_client__then_json_served(self):
+        # Arrange
+        server = create_server(create_history(), 0)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+
+        # Act
+        try:
+            status, results = get_json(server, "/directories?depth=1")
+            missing_status, _ = get_json(server, "/unknown")
+            bad_status, _ = get_json(server, "/histogram?column=none")
+            bad_level_status, _ = get_json(server, "/bus_factor?level=foo")
+            bad_top_statuses = [
+                get_json(server, "/hotspots?top=-1")[0],
+                get_json(server, "/histogram?top=0")[0],
+            ]
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        # Assert
+        self.assertEqual(status, 200)
+        self.assertEqual(results["path"], "")
+        self.assertEqual(results["files"], 11)
+        self.assertEqual(missing_status, 404)
+        self.assertEqual(bad_status, 400)
+        self.assertEqual(bad_level_status, 400)
+        self.assertEqual(bad_top_statuses, [400, 400])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+from SourceTreeScanner import *
+
+
+def create_source_tree(source_path, files):
+    for file, text in files.items():
+        os.makedirs(os.path.dirname(os.path.join(source_path, file)), exist_ok=True)
+        with open(os.path.join(source_path, file), "w") as source_file:
+            source_file.write(text)
+
+
+class UnitTests(unittest.TestCase):
+    def test_scan__given_gitignore_and_excluded_dirs__then_pruned_files_skipped(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            create_source_tree(
+                temp_dir,
+                {
+                    ".gitignore": "build/\n*.log\n!keep.log\n",
+                    ".hidden.py": "x",
+                    "app.py": "12345",
+                    "Makefile": "all:",
+                    "debug.log": "x",
+                    "keep.log": "123",
+                    "build/out.py": "x",
+                    "node_modules/lib/index.js": "x",
+                    "src/.gitignore": "/generated.py\n",
+                    "src/generated.py": "x",
+                    "src/lib/generated.py": "12",
+                },
+            )
+
+            # Act
+            results = SourceTreeScanner(temp_dir).scan()
+
+        # Assert
+        self.assertEqual(
+            results, {"app.py": 5, "keep.log": 3, "src/lib/generated.py": 2}
+        )
+
+    def test_scan__given_cache_file__then_only_changed_files_measured(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_path = os.path.join(temp_dir, "src")
+            cache_filename = os.path.join(temp_dir, "cache.json")
+            create_source_tree(source_path, {"a.py": "1", "b.py": "22", "c.py": "3"})
+            measured_files = []
+
+            def measure_size(path, stat):
+                measured_files.append(os.path.basename(path))
+                return stat.st_size
+
+            SourceTreeScanner(source_path, cache_filename=cache_filename).scan(
+                measure_size
+            )
+            measured_files.clear()
+            create_source_tree(source_path, {"b.py": "4444"})
+            scanner = SourceTreeScanner(source_path, cache_filename=cache_filename)
+
+            # Act
+            results = scanner.scan(measure_size)
+
+        # Assert
+        self.assertEqual(results, {"a.py": 1, "b.py": 4, "c.py": 1})
+        self.assertEqual(measured_files, ["b.py"])
+        self.assertEqual(scanner.cached_count, 2)
+
+    def test_gitignore_pattern_to_regex__given_patterns__then_git_matching_rules(
+        self,
+    ):
+        # Arrange
+        patterns = [
+            ("*.pyc", "", "lib/a.pyc", True),
+            ("*.pyc", "", "lib/a.py", False),
+            ("/dist", "", "lib/dist", False),
+            ("docs/*.md", "", "docs/a.md", True),
+            ("docs/*.md", "", "docs/api/a.md", False),
+            ("docs/**/*.md", "", "docs/api/a.md", True),
+            ("tmp", "src/", "src/a/tmp", True),
+            ("tmp", "src/", "tmp", False),
+            ("file[0-9].txt", "", "file7.txt", True),
+        ]
+
+        # Act
+        results = [
+            re.match(gitignore_pattern_to_regex(pattern, relative_dir), path)
+            is not None
+            for pattern, relative_dir, path, expected in patterns
+        ]
+
+        # Assert
+        self.assertEqual(results, [expected for _, _, _, expected in patterns])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import patch, Mock, MagicMock, PropertyMock
+from TopX import *
+
+
+class UnitTests(unittest.TestCase):
+    def test_add__given_more_values_than_topn__then_largest_kept_in_order(self):
+        # Arrange
+        top_list = TopX(3)
+
+        # Act
+        for value in [5, 1, 9, 3, 7, 2]:
+            top_list.add(value)
+
+        # Assert
+        self.assertEqual(top_list.values, [9, 7, 5])
+        self.assertEqual(len(top_list), 3)
+
+    def test_add__given_key_and_ties__then_first_added_ranks_higher(self):
+        # Arrange
+        top_list = TopX(2, key=lambda item: item[0])
+
+        # Act
+        top_list.add_all([(1, "a"), (2, "b"), (2, "c"), (2, "d")])
+
+        # Assert
+        self.assertEqual(top_list.values, [(2, "b"), (2, "c")])
+
+    def test_merge__given_two_partitions__then_same_as_one_top_list(self):
+        # Arrange
+        values = [(4, "a"), (8, "b"), (4, "c"), (6, "d"), (8, "e"), (1, "f")]
+        top_list = TopX(4, key=lambda item: item[0])
+        top_list.add_all(values)
+        first_part = TopX(4, key=lambda item: item[0])
+        first_part.add_all(values[:3])
+        second_part = TopX(4, key=lambda item: item[0])
+        second_part.add_all(values[3:])
+
+        # Act
+        results = first_part.merge(second_part)
+
+        # Assert
+        self.assertEqual(results.values, top_list.values)
+        self.assertEqual(results.values, [(8, "b"), (8, "e"), (6, "d"), (4, "a")])
+
+
+if __name__ == "__main__":
+    unittest.main()